@@ -0,0 +1,5 @@
+# The code lives in comfyui_api.api; this shim only serves scripts run from a
+# source checkout that still import `api`. It is not installed.
+from comfyui_api._aliases import alias
+
+alias(__name__, 'comfyui_api.api')
@@ -0,0 +1,313 @@
+import asyncio
+import json
+import os
+import struct
+import threading
+import uuid
+from aiohttp import web
+
+# In-process stand-in for a ComfyUI server, for benchmarks on machines without
+# a GPU. It implements the endpoints this client uses and replays the message
+# sequence of a real execution: execution_start, execution_cached, one
+# executing per node, progress steps with binary previews for samplers,
+# executed for output nodes and finally executing with node None. Prompts run
+# one at a time in queue order, and nodes whose inputs did not change since the
+# previous prompt are reported as cached and cost no time, like in ComfyUI.
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+SAMPLERS = ('KSampler', 'KSamplerAdvanced')
+OUTPUT_NODES = ('SaveImage', 'PreviewImage', 'SaveImageWebsocket')
+
+def _node(inputs, outputs, output_node=False, optional=None):
+  return {'input': {'required': inputs, 'optional': optional or {}}, 'output': outputs, 'output_node': output_node}
+
+# /object_info for the node classes the sample workflows use.
+OBJECT_INFO = {
+  'CheckpointLoaderSimple': _node({'ckpt_name': [['sdXL_v10VAEFix.safetensors', 'a', 'b']]}, ['MODEL', 'CLIP', 'VAE']),
+  'CLIPTextEncode': _node({'text': ['STRING', {'multiline': True}], 'clip': ['CLIP']}, ['CONDITIONING']),
+  'EmptyLatentImage': _node({'width': ['INT', {'default': 512, 'min': 16, 'max': 16384}], 'height': ['INT', {'default': 512, 'min': 16, 'max': 16384}], 'batch_size': ['INT', {'default': 1, 'min': 1, 'max': 4096}]}, ['LATENT']),
+  'KSampler': _node({
+    'model': ['MODEL'], 'seed': ['INT', {'min': 0, 'max': 0xffffffffffffffff}], 'steps': ['INT', {'min': 1, 'max': 10000}],
+    'cfg': ['FLOAT', {'min': 0.0, 'max': 100.0}], 'sampler_name': [['euler', 'dpmpp_2m', 'dpmpp_3m_sde']], 'scheduler': [['normal', 'karras']],
+    'positive': ['CONDITIONING'], 'negative': ['CONDITIONING'], 'latent_image': ['LATENT'], 'denoise': ['FLOAT', {'min': 0.0, 'max': 1.0}]
+  }, ['LATENT']),
+  'VAEDecode': _node({'samples': ['LATENT'], 'vae': ['VAE']}, ['IMAGE']),
+  'VAEEncode': _node({'pixels': ['IMAGE'], 'vae': ['VAE']}, ['LATENT']),
+  'LoadImage': _node({'image': [['example.png'], {'image_upload': True}]}, ['IMAGE', 'MASK']),
+  'SaveImage': _node({'images': ['IMAGE'], 'filename_prefix': ['STRING', {'default': 'ComfyUI'}]}, [], True),
+  'PreviewImage': _node({'images': ['IMAGE']}, [], True),
+  'SaveImageWebsocket': _node({'images': ['IMAGE']}, [], True)
+}
+
+class FakeComfyUI:
+  def __init__(self, node_delays=None, default_delay=0.005, sampler_steps=20, step_delay=0.005, image_size=512 * 1024, host='127.0.0.1', port=0, stall_classes=(), fail_classes=()):
+    # Nodes of a class in stall_classes never finish until /interrupt is
+    # called; nodes in fail_classes report execution_error.
+    self.node_delays = node_delays or {}
+    self.stall_classes = set(stall_classes)
+    self.fail_classes = set(fail_classes)
+    self.default_delay = default_delay
+    self.sampler_steps = sampler_steps
+    self.step_delay = step_delay
+    self.image_size = image_size
+    self.host = host
+    self.port = port
+    self.address = None
+    self.history = {}
+    self.uploads = {}
+    self.request_counts = {}
+    self._clients = {}
+    self._queue = None
+    self._running = None
+    self._pending = []
+    self._cache = {}
+    self._interrupted = False
+    self._interrupt_event = None
+    self._image = PNG_SIGNATURE + os.urandom(max(0, image_size - len(PNG_SIGNATURE)))
+    self._loop = None
+    self._runner = None
+    self._thread = None
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *exc):
+    self.stop()
+
+  def start(self):
+    ready = threading.Event()
+    self._thread = threading.Thread(target=self._serve, args=(ready,), name='fake-comfyui', daemon=True)
+    self._thread.start()
+    ready.wait()
+    return self
+
+  def stop(self):
+    if self._loop is not None:
+      asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+      self._loop.call_soon_threadsafe(self._loop.stop)
+      self._thread.join()
+      self._loop = None
+
+  def _serve(self, ready):
+    self._loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(self._loop)
+    self._queue = asyncio.Queue()
+    self._interrupt_event = asyncio.Event()
+    app = web.Application(client_max_size=1024 ** 3)
+    app.router.add_get('/ws', self._ws)
+    app.router.add_post('/prompt', self._post_prompt)
+    app.router.add_get('/prompt', self._get_prompt)
+    app.router.add_get('/queue', self._get_queue)
+    app.router.add_post('/queue', self._post_queue)
+    app.router.add_get('/history', self._get_history_all)
+    app.router.add_get('/history/{prompt_id}', self._get_history)
+    app.router.add_post('/history', self._post_history)
+    app.router.add_get('/view', self._view)
+    app.router.add_post('/upload/image', self._upload)
+    app.router.add_post('/free', self._free)
+    app.router.add_post('/interrupt', self._interrupt)
+    app.router.add_get('/system_stats', self._system_stats)
+    app.router.add_get('/object_info', self._object_info)
+    self._runner = web.AppRunner(app)
+    self._loop.run_until_complete(self._runner.setup())
+    site = web.TCPSite(self._runner, self.host, self.port)
+    self._loop.run_until_complete(site.start())
+    self.port = site._server.sockets[0].getsockname()[1]
+    self.address = '{}:{}'.format(self.host, self.port)
+    self._worker = self._loop.create_task(self._execute_queue())
+    ready.set()
+    self._loop.run_forever()
+
+  async def _shutdown(self):
+    self._worker.cancel()
+    for ws in list(self._clients.values()):
+      await ws.close()
+    await self._runner.cleanup()
+
+  def _count(self, name):
+    self.request_counts[name] = self.request_counts.get(name, 0) + 1
+
+  async def _send(self, client_id, message):
+    ws = self._clients.get(client_id)
+    if ws is None or ws.closed:
+      return
+    if isinstance(message, bytes):
+      await ws.send_bytes(message)
+    else:
+      await ws.send_str(json.dumps(message))
+
+  async def _broadcast_status(self):
+    remaining = len(self._pending) + (1 if self._running else 0)
+    message = {'type': 'status', 'data': {'status': {'exec_info': {'queue_remaining': remaining}}}}
+    for client_id in list(self._clients):
+      await self._send(client_id, message)
+
+  async def _ws(self, request):
+    self._count('ws')
+    ws = web.WebSocketResponse(max_msg_size=0)
+    await ws.prepare(request)
+    client_id = request.query.get('clientId') or uuid.uuid4().hex
+    self._clients[client_id] = ws
+    await self._send(client_id, {'type': 'status', 'data': {'status': {'exec_info': {'queue_remaining': len(self._pending)}}, 'sid': client_id}})
+    async for _ in ws:
+      pass
+    if self._clients.get(client_id) is ws:
+      del self._clients[client_id]
+    return ws
+
+  async def _post_prompt(self, request):
+    self._count('prompt')
+    body = await request.json()
+    prompt_id = str(uuid.uuid4())
+    item = (prompt_id, body['prompt'], body.get('client_id'))
+    if body.get('front'):
+      self._pending.insert(0, item)
+    else:
+      self._pending.append(item)
+    self._queue.put_nowait(None)
+    await self._broadcast_status()
+    return web.json_response({'prompt_id': prompt_id, 'number': len(self.history) + len(self._pending), 'node_errors': {}})
+
+  async def _get_prompt(self, request):
+    return web.json_response({'exec_info': {'queue_remaining': len(self._pending) + (1 if self._running else 0)}})
+
+  async def _get_queue(self, request):
+    self._count('queue')
+    running = [[0, self._running[0], self._running[1], {}, []]] if self._running else []
+    pending = [[i + 1, prompt_id, prompt, {}, []] for i, (prompt_id, prompt, _) in enumerate(self._pending)]
+    return web.json_response({'queue_running': running, 'queue_pending': pending})
+
+  async def _post_queue(self, request):
+    body = await request.json()
+    if body.get('clear'):
+      self._pending.clear()
+    delete = set(body.get('delete', []))
+    self._pending = [item for item in self._pending if item[0] not in delete]
+    return web.json_response({})
+
+  async def _get_history_all(self, request):
+    self._count('history')
+    max_items = int(request.query.get('max_items', 0)) or None
+    items = list(self.history.items())
+    if max_items:
+      items = items[-max_items:]
+    return web.json_response(dict(items))
+
+  async def _get_history(self, request):
+    self._count('history')
+    prompt_id = request.match_info['prompt_id']
+    return web.json_response({prompt_id: self.history[prompt_id]} if prompt_id in self.history else {})
+
+  async def _post_history(self, request):
+    body = await request.json()
+    if body.get('clear'):
+      self.history.clear()
+    for prompt_id in body.get('delete', []):
+      self.history.pop(prompt_id, None)
+    return web.json_response({})
+
+  async def _view(self, request):
+    self._count('view')
+    return web.Response(body=self._image, content_type='image/png')
+
+  async def _upload(self, request):
+    self._count('upload')
+    data = await request.post()
+    image = data['image']
+    self.uploads[image.filename] = len(image.file.read())
+    return web.json_response({'name': image.filename, 'subfolder': '', 'type': data.get('type', 'input')})
+
+  async def _free(self, request):
+    self._count('free')
+    body = await request.json()
+    if body.get('unload_models'):
+      self._cache.clear()
+    return web.Response()
+
+  async def _interrupt(self, request):
+    self._count('interrupt')
+    body = await request.json() if request.can_read_body else {}
+    if self._running and body.get('prompt_id', self._running[0]) == self._running[0]:
+      self._interrupted = True
+      self._interrupt_event.set()
+    return web.Response()
+
+  async def _object_info(self, request):
+    self._count('object_info')
+    return web.json_response(OBJECT_INFO)
+
+  async def _system_stats(self, request):
+    return web.json_response({'system': {'comfyui_version': 'fake'}, 'devices': [{'name': 'fake', 'type': 'cuda', 'vram_total': 24 * 1024 ** 3, 'vram_free': 20 * 1024 ** 3}]})
+
+  async def _execute_queue(self):
+    while True:
+      await self._queue.get()
+      if not self._pending:
+        continue
+      self._running = self._pending.pop(0)
+      try:
+        await self._execute(*self._running)
+      finally:
+        self._running = None
+        await self._broadcast_status()
+
+  def _signature(self, prompt, node_id, memo):
+    if node_id not in memo:
+      node = prompt[node_id]
+      inputs = {
+        key: self._signature(prompt, value[0], memo) if isinstance(value, list) and len(value) == 2 and value[0] in prompt else value
+        for key, value in node['inputs'].items()
+      }
+      memo[node_id] = json.dumps([node['class_type'], inputs], sort_keys=True)
+    return memo[node_id]
+
+  async def _execute(self, prompt_id, prompt, client_id):
+    self._interrupted = False
+    self._interrupt_event.clear()
+    await self._send(client_id, {'type': 'execution_start', 'data': {'prompt_id': prompt_id}})
+    memo = {}
+    signatures = {node_id: self._signature(prompt, node_id, memo) for node_id in prompt}
+    cached = [node_id for node_id, signature in signatures.items() if self._cache.get(node_id) == signature and prompt[node_id]['class_type'] not in OUTPUT_NODES]
+    await self._send(client_id, {'type': 'execution_cached', 'data': {'nodes': cached, 'prompt_id': prompt_id}})
+
+    outputs = {}
+    status = 'success'
+    for node_id, node in prompt.items():
+      if node_id in cached:
+        continue
+      if self._interrupted:
+        await self._send(client_id, {'type': 'execution_interrupted', 'data': {'prompt_id': prompt_id, 'node_id': node_id}})
+        status = 'error'
+        break
+      class_type = node['class_type']
+      await self._send(client_id, {'type': 'executing', 'data': {'node': node_id, 'prompt_id': prompt_id}})
+      if class_type in SAMPLERS:
+        steps = self.sampler_steps
+        for step in range(1, steps + 1):
+          await asyncio.sleep(self.step_delay)
+          await self._send(client_id, {'type': 'progress', 'data': {'value': step, 'max': steps, 'prompt_id': prompt_id, 'node': node_id}})
+          await self._send(client_id, struct.pack('>II', 1, 1) + b'\xff\xd8\xff' + bytes(61))
+      if class_type in self.stall_classes:
+        await self._interrupt_event.wait()
+        await self._send(client_id, {'type': 'execution_interrupted', 'data': {'prompt_id': prompt_id, 'node_id': node_id, 'node_type': class_type}})
+        status = 'error'
+        break
+      if class_type in self.fail_classes:
+        await self._send(client_id, {'type': 'execution_error', 'data': {'prompt_id': prompt_id, 'node_id': node_id, 'node_type': class_type, 'exception_message': 'fake failure', 'exception_type': 'RuntimeError', 'traceback': []}})
+        status = 'error'
+        break
+      await asyncio.sleep(self.node_delays.get(class_type, self.default_delay))
+      if class_type == 'SaveImageWebsocket':
+        await self._send(client_id, struct.pack('>II', 1, 2) + self._image)
+      elif class_type in OUTPUT_NODES:
+        image_type = 'output' if class_type == 'SaveImage' else 'temp'
+        outputs[node_id] = {'images': [{'filename': 'ComfyUI_{}_{}.png'.format(prompt_id[:8], node_id), 'subfolder': '', 'type': image_type}]}
+        await self._send(client_id, {'type': 'executed', 'data': {'node': node_id, 'output': outputs[node_id], 'prompt_id': prompt_id}})
+      self._cache[node_id] = signatures[node_id]
+
+    self.history[prompt_id] = {
+      'prompt': [0, prompt_id, prompt, {'client_id': client_id}, list(outputs)],
+      'outputs': outputs,
+      'status': {'status_str': status, 'completed': status == 'success', 'messages': []}
+    }
+    await self._send(client_id, {'type': 'executing', 'data': {'node': None, 'prompt_id': prompt_id}})
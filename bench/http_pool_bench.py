@@ -0,0 +1,63 @@
+import json
+import statistics
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from comfyui_api.api.websocket_api import get_history
+
+# Per-request latency of GET /history/{id} against a local keep-alive stub,
+# once with a fresh urllib connection per call (the old transport) and once
+# through the pooled api.http_pool transport.
+#
+#   python -m bench.http_pool_bench
+
+REQUESTS = 2000
+
+class StubHandler(BaseHTTPRequestHandler):
+  protocol_version = 'HTTP/1.1'
+  disable_nagle_algorithm = True
+
+  def do_GET(self):
+    body = json.dumps({'x': {'outputs': {}, 'status': {'completed': True}}}).encode('utf-8')
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, *args):
+    pass
+
+def start_stub_server():
+  server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+  server.daemon_threads = True
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  return server, '127.0.0.1:{}'.format(server.server_address[1])
+
+def urllib_get_history(prompt_id, server_address):
+  with urllib.request.urlopen("http://{}/history/{}".format(server_address, prompt_id)) as response:
+    return json.loads(response.read())
+
+def measure(fn, server_address):
+  samples = []
+  for _ in range(REQUESTS):
+    start = time.perf_counter()
+    fn('x', server_address)
+    samples.append((time.perf_counter() - start) * 1e6)
+  samples.sort()
+  return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+def main():
+  server, server_address = start_stub_server()
+  try:
+    for name, fn in (('urllib (new connection)', urllib_get_history), ('pooled keep-alive', get_history)):
+      fn('x', server_address) # warm up
+      mean, p50, p99 = measure(fn, server_address)
+      print('{:<26} mean {:8.1f}us  p50 {:8.1f}us  p99 {:8.1f}us'.format(name, mean, p50, p99))
+  finally:
+    server.shutdown()
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,56 @@
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Cold-start cost of importing the client, measured in fresh interpreters so
+# nothing is cached in sys.modules. Exits with status 1 when the median of a
+# target exceeds its budget, so it can guard CI against an eager heavy import.
+#
+#   python -m bench.import_bench --runs 15
+
+# module -> budget in milliseconds on a typical laptop
+TARGETS = {
+  'comfyui_api': 5,
+  'comfyui_api.api.websocket_api': 45,
+  'comfyui_api.api.comfy_session': 55,
+  'comfyui_api.api.api_helpers': 60,
+  'comfyui_api.utils.actions.prompt_to_image_batch': 70
+}
+
+# Modules that must not be loaded by a plain import of the targets above.
+LAZY_MODULES = ('PIL', 'numpy', 'requests_toolbelt', 'requests', 'aiohttp', 'websocket')
+
+CHILD = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed * 1000, ','.join(name for name in {lazy!r} if name in sys.modules))
+"""
+
+def measure(module, runs):
+  timings = []
+  loaded = ''
+  for _ in range(runs):
+    out = subprocess.run([sys.executable, '-c', CHILD.format(module=module, lazy=LAZY_MODULES)], capture_output=True, text=True, check=True).stdout.split()
+    timings.append(float(out[0]))
+    loaded = out[1] if len(out) > 1 else ''
+  return statistics.median(timings), loaded
+
+def main():
+  parser = argparse.ArgumentParser(description='Import time of the client in fresh interpreters')
+  parser.add_argument('--runs', type=int, default=11)
+  parser.add_argument('--scale', type=float, default=1.0, help='multiply every budget, e.g. 2 on slow CI machines')
+  args = parser.parse_args()
+
+  failed = False
+  for module, budget in TARGETS.items():
+    median, loaded = measure(module, args.runs)
+    over = median > budget * args.scale
+    failed = failed or over or bool(loaded)
+    print('{:<48} {:7.1f}ms  budget {:5.0f}ms  {}{}'.format(module, median, budget * args.scale, 'OVER BUDGET ' if over else '', 'eagerly loads ' + loaded if loaded else ''))
+  sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,91 @@
+import argparse
+import contextlib
+import os
+import tempfile
+import threading
+import time
+
+from comfyui_api.api.api_helpers import generate_image_by_prompt, generate_image_by_prompt_and_image
+from comfyui_api.api.comfy_session import ComfySession
+from bench.fake_comfy import FakeComfyUI
+from comfyui_api.utils.helpers.workflow_template import WorkflowTemplate
+
+# End-to-end latency percentiles and images/sec against the in-process fake
+# ComfyUI. Runs on any machine; no GPU or ComfyUI install needed.
+#
+#   python -m bench.latency_bench --requests 50 --concurrency 4
+
+def percentile(samples, fraction):
+  ordered = sorted(samples)
+  return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def report(name, samples, wall_seconds, images):
+  print('{:<24} n={:<4} p50 {:7.1f}ms  p90 {:7.1f}ms  p99 {:7.1f}ms  {:7.2f} images/s'.format(
+    name, len(samples), percentile(samples, 0.5) * 1000, percentile(samples, 0.9) * 1000,
+    percentile(samples, 0.99) * 1000, images / wall_seconds))
+
+def run(requests, concurrency, generate):
+  samples = []
+  counter = iter(range(requests))
+  lock = threading.Lock()
+
+  def worker():
+    while True:
+      with lock:
+        index = next(counter, None)
+      if index is None:
+        return
+      start = time.perf_counter()
+      generate(index)
+      elapsed = time.perf_counter() - start
+      with lock:
+        samples.append(elapsed)
+
+  start = time.perf_counter()
+  threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return samples, time.perf_counter() - start
+
+def main():
+  parser = argparse.ArgumentParser(description='End-to-end latency against an in-process fake ComfyUI')
+  parser.add_argument('--requests', type=int, default=30)
+  parser.add_argument('--concurrency', type=int, default=4)
+  parser.add_argument('--node-delay', type=float, default=0.005, help='seconds spent in every non-cached node')
+  parser.add_argument('--sampler-steps', type=int, default=20)
+  parser.add_argument('--step-delay', type=float, default=0.005, help='seconds per sampler step')
+  parser.add_argument('--image-size', type=int, default=512 * 1024, help='bytes per output image')
+  args = parser.parse_args()
+
+  text_to_image = WorkflowTemplate.from_file('./workflows/base_workflow.json')
+  image_to_image = WorkflowTemplate.from_file('./workflows/basic_image_to_image.json')
+  input_path = './input/ComfyUI_00299_.png'
+  filename = os.path.basename(input_path)
+
+  fake = FakeComfyUI(default_delay=args.node_delay, sampler_steps=args.sampler_steps, step_delay=args.step_delay, image_size=args.image_size)
+  with fake, tempfile.TemporaryDirectory() as output_path, ComfySession(fake.address) as session:
+    def text_prompt(i):
+      generate_image_by_prompt(text_to_image.render('bench {}'.format(i)), output_path, session=session)
+
+    def image_prompt(i):
+      prompt = image_to_image.render('bench {}'.format(i), image=filename)
+      generate_image_by_prompt_and_image(prompt, output_path, input_path, filename, session=session)
+
+    scenarios = [
+      ('sequential', 1, text_prompt),
+      ('concurrent x{}'.format(args.concurrency), args.concurrency, text_prompt),
+      ('img2img + upload', 1, image_prompt)
+    ]
+    results = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull): # silence track_progress
+      for name, concurrency, generate in scenarios:
+        samples, wall_seconds = run(args.requests, concurrency, generate)
+        results.append((name, samples, wall_seconds))
+    for name, samples, wall_seconds in results:
+      report(name, samples, wall_seconds, len(samples))
+    print('requests served:', dict(sorted(fake.request_counts.items())))
+
+if __name__ == '__main__':
+  main()
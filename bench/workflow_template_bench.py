@@ -0,0 +1,51 @@
+import json
+import time
+
+from comfyui_api.utils.actions.load_workflow import load_workflow
+from comfyui_api.utils.helpers.randomize_seed import generate_random_15_digit_number
+from comfyui_api.utils.helpers.workflow_template import WorkflowTemplate
+
+# Per-request prompt construction cost for large graphs: the old path
+# (json.loads of the workflow string plus linear scans) against
+# WorkflowTemplate.render.
+#
+#   python -m bench.workflow_template_bench
+
+ITERATIONS = 500
+
+def large_workflow(extra_nodes):
+  workflow = json.loads(load_workflow('./workflows/base_workflow.json'))
+  for i in range(extra_nodes):
+    workflow[str(1000 + i)] = {
+      'class_type': 'ImageScaleBy',
+      'inputs': {'image': ['8', 0], 'upscale_method': 'lanczos', 'scale_by': 1.0 + i / 1000}
+    }
+  return json.dumps(workflow)
+
+def build_prompt_json(workflow, positve_prompt, negative_prompt):
+  prompt = json.loads(workflow)
+  id_to_class_type = {id: details['class_type'] for id, details in prompt.items()}
+  k_sampler = [key for key, value in id_to_class_type.items() if value == 'KSampler'][0]
+  prompt.get(k_sampler)['inputs']['seed'] = generate_random_15_digit_number()
+  postive_input_id = prompt.get(k_sampler)['inputs']['positive'][0]
+  prompt.get(postive_input_id)['inputs']['text'] = positve_prompt
+  negative_input_id = prompt.get(k_sampler)['inputs']['negative'][0]
+  prompt.get(negative_input_id)['inputs']['text'] = negative_prompt
+  return prompt
+
+def measure(fn):
+  start = time.perf_counter()
+  for _ in range(ITERATIONS):
+    fn()
+  return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+def main():
+  for size in (10, 100, 500, 2000):
+    workflow = large_workflow(size)
+    template = WorkflowTemplate(workflow)
+    old = measure(lambda: build_prompt_json(workflow, 'a castle', 'blurry'))
+    new = measure(lambda: template.render('a castle', 'blurry'))
+    print('{:>5} nodes  json.loads + scan {:9.1f}us  template.render {:7.1f}us'.format(len(template.graph), old, new))
+
+if __name__ == '__main__':
+  main()
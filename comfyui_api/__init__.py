@@ -0,0 +1,55 @@
+import importlib
+
+# Public API in one namespace. Nothing is imported until it is first used, so
+# `import comfyui_api` stays cheap for short-lived processes; PIL, NumPy, the
+# multipart encoder and aiohttp are only loaded by the features that need them.
+_EXPORTS = {
+  'ComfySession': 'comfyui_api.api.comfy_session',
+  'get_session': 'comfyui_api.api.comfy_session',
+  'queue_prompt': 'comfyui_api.api.websocket_api',
+  'get_history': 'comfyui_api.api.websocket_api',
+  'get_image': 'comfyui_api.api.websocket_api',
+  'upload_image': 'comfyui_api.api.websocket_api',
+  'cancel_prompt': 'comfyui_api.api.websocket_api',
+  'clear_comfy_cache': 'comfyui_api.api.websocket_api',
+  'generate_image_by_prompt': 'comfyui_api.api.api_helpers',
+  'generate_image_by_prompt_and_image': 'comfyui_api.api.api_helpers',
+  'generate_image_arrays': 'comfyui_api.api.api_helpers',
+  'download_images': 'comfyui_api.api.api_helpers',
+  'track_progress': 'comfyui_api.api.api_helpers',
+  'ExecutionError': 'comfyui_api.api.exceptions',
+  'ExecutionInterrupted': 'comfyui_api.api.exceptions',
+  'PromptTimeout': 'comfyui_api.api.exceptions',
+  'PromptValidationError': 'comfyui_api.api.exceptions',
+  'TimingRecorder': 'comfyui_api.api.progress',
+  'iter_progress_events': 'comfyui_api.api.progress',
+  'ComfyCluster': 'comfyui_api.api.cluster',
+  'UploadCache': 'comfyui_api.api.upload_cache',
+  'ResultCache': 'comfyui_api.api.result_cache',
+  'PostProcessor': 'comfyui_api.api.postprocess',
+  'SharedImage': 'comfyui_api.api.shared_output',
+  'JobJournal': 'comfyui_api.api.job_journal',
+  'HistoryReconciler': 'comfyui_api.api.history_reconciler',
+  'ModelScheduler': 'comfyui_api.api.model_scheduler',
+  'FairScheduler': 'comfyui_api.api.fair_scheduler',
+  'PromptValidator': 'comfyui_api.api.prompt_validation',
+  'Gateway': 'comfyui_api.api.gateway',
+  'WorkflowTemplate': 'comfyui_api.utils.helpers.workflow_template',
+  'load_workflow': 'comfyui_api.utils.actions.load_workflow',
+  'prompt_to_image': 'comfyui_api.utils.actions.prompt_to_image',
+  'prompt_image_to_image': 'comfyui_api.utils.actions.prompt_image_to_image',
+  'prompt_to_image_batch': 'comfyui_api.utils.actions.prompt_to_image_batch',
+  'sweep': 'comfyui_api.utils.actions.sweep'
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+  if name not in _EXPORTS:
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+  value = getattr(importlib.import_module(_EXPORTS[name]), name)
+  globals()[name] = value
+  return value
+
+def __dir__():
+  return sorted(list(globals()) + __all__)
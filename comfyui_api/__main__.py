@@ -0,0 +1,26 @@
+import argparse
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog='python -m comfyui_api')
+  commands = parser.add_subparsers(dest='command', required=True)
+  serve_parser = commands.add_parser('serve', help='run the HTTP gateway in front of one or more ComfyUI servers')
+  serve_parser.add_argument('--host', default='127.0.0.1')
+  serve_parser.add_argument('--port', type=int, default=8000)
+  serve_parser.add_argument('--comfyui', action='append', dest='server_addresses', metavar='ADDRESS', help='ComfyUI server address, repeat for several (default 127.0.0.1:8188)')
+  serve_parser.add_argument('--max-queue', type=int, default=100, help='jobs admitted before requests get 429')
+  serve_parser.add_argument('--workers-per-server', type=int, default=2)
+  serve_parser.add_argument('--output', default='./output/', dest='output_path')
+  serve_parser.add_argument('--timeout', type=float, default=None, dest='job_timeout', help='cancel jobs that take longer than this many seconds')
+  serve_parser.add_argument('--coalesce', action='store_true', help='run identical jobs submitted while one is in flight only once')
+  args = parser.parse_args(argv)
+
+  if args.command == 'serve':
+    from comfyui_api.api.gateway import serve
+    serve(
+      args.server_addresses or ['127.0.0.1:8188'], args.host, args.port,
+      max_queue=args.max_queue, workers_per_server=args.workers_per_server,
+      output_path=args.output_path, job_timeout=args.job_timeout, coalesce=args.coalesce
+    )
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,29 @@
+import importlib
+import importlib.abc
+import importlib.util
+import sys
+
+# Lets the top-level `api` and `utils` shims of a source checkout keep working
+# for scripts written before the code moved into comfyui_api. `api.X` resolves
+# to the module object of `comfyui_api.api.X` itself rather than a second copy,
+# so sessions, caches and exception classes are shared between both names.
+
+class _Alias(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+  def __init__(self, old, new):
+    self.old = old
+    self.new = new
+
+  def find_spec(self, name, path=None, target=None):
+    if name.startswith(self.old + '.'):
+      return importlib.util.spec_from_loader(name, self)
+    return None
+
+  def create_module(self, spec):
+    return importlib.import_module(self.new + spec.name[len(self.old):])
+
+  def exec_module(self, module):
+    pass # already executed under its real name
+
+def alias(old, new):
+  sys.meta_path.insert(0, _Alias(old, new))
+  sys.modules[old] = importlib.import_module(new)
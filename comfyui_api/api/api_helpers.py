@@ -0,0 +1,267 @@
+import json
+import io
+import os
+import time
+
+# Assuming the import paths are correct and the methods are defined elsewhere:
+from comfyui_api.api.websocket_api import get_history, get_image, download_image, upload_image, clear_comfy_cache
+from comfyui_api.api.comfy_session import get_session
+from comfyui_api.api.atomic_file import atomic_open
+from comfyui_api.api.progress import iter_progress_events, raise_for_event, PromptTimings
+from comfyui_api.api.exceptions import PromptTimeout
+from comfyui_api.api.image_input import source_digest
+from comfyui_api.api.websocket_output import use_websocket_output, iter_websocket_images
+
+TRANSCODE_EXTENSIONS = {'jpeg': '.jpg', 'jpg': '.jpg', 'png': '.png', 'webp': '.webp'}
+
+class SavedImages(list):
+  # The images save_image and download_images managed to save. A failure to
+  # save one is printed and skipped; `failed` counts them, so callers can tell
+  # a partial result from a complete one.
+  def __init__(self, images=(), failed=0):
+    super().__init__(images)
+    self.failed = failed
+
+def generate_image_by_prompt(prompt, output_path, save_previews=False, session=None, transcode=None, websocket_output=False, result_cache=None, metrics=None, timeout=None, postprocessor=None):
+  # With websocket_output the final images arrive over the websocket instead of
+  # being written on the server and fetched through /history and /view.
+  # `metrics` (a TimingRecorder) receives the per-prompt latency breakdown.
+  # With a timeout the prompt is cancelled on the server once it runs late.
+  # A PostProcessor saves the images in worker processes as they arrive.
+  if result_cache is not None:
+    key = result_cache.key(prompt, json.dumps([save_previews, transcode, websocket_output] + postprocessor_key(postprocessor)))
+    return cached_generation(result_cache, key, output_path, save_previews, lambda: generate_image_by_prompt(prompt, output_path, save_previews, session, transcode, websocket_output, metrics=metrics, timeout=timeout, postprocessor=postprocessor))
+  if websocket_output:
+    timings = PromptTimings(prompt, None)
+    images = stream_websocket_images(prompt, session, save_previews, timings, timeout)
+    if postprocessor is None:
+      images = list(images)
+    start = time.monotonic()
+    saved = save_image(images, output_path, save_previews, transcode, postprocessor)
+    if metrics is not None:
+      timings.record_stage('save', time.monotonic() - start)
+      metrics.record(timings)
+    return saved
+  session = session or get_session()
+  channel = session.submit(prompt)
+  return finish_generation(prompt, channel, session, output_path, save_previews, transcode, metrics, timeout=timeout, postprocessor=postprocessor)
+
+def generate_image_by_prompt_and_image(prompt, output_path, input_path, filename, save_previews=False, session=None, transcode=None, upload_cache=None, result_cache=None, metrics=None, timeout=None, postprocessor=None):
+  if result_cache is not None:
+    key = result_cache.key(prompt, json.dumps([source_digest(input_path), save_previews, transcode] + postprocessor_key(postprocessor)))
+    return cached_generation(result_cache, key, output_path, save_previews, lambda: generate_image_by_prompt_and_image(prompt, output_path, input_path, filename, save_previews, session, transcode, upload_cache, metrics=metrics, timeout=timeout, postprocessor=postprocessor))
+  session = session or get_session()
+  start = time.monotonic()
+  if upload_cache is not None:
+    upload_cache.watch(session)
+    prompt = point_image_loaders(prompt, filename, upload_cache.upload(input_path, session.server_address))
+  else:
+    upload_image(input_path, filename, session.server_address)
+  upload_seconds = time.monotonic() - start
+  channel = session.submit(prompt)
+  return finish_generation(prompt, channel, session, output_path, save_previews, transcode, metrics, {'upload': upload_seconds}, timeout, postprocessor)
+
+def generate_image_arrays(prompt, save_previews=False, session=None, shared=False, websocket_output=False, timeout=None):
+  # Returns the images decoded to NumPy arrays instead of saving them. With
+  # shared=True they are placed in shared memory for worker processes and must
+  # be released by the caller; see api.shared_output.
+  from comfyui_api.api.shared_output import decode_images # pulls in numpy and PIL
+  if websocket_output:
+    return decode_images(stream_websocket_images(prompt, session, save_previews, None, timeout), shared)
+  session = session or get_session()
+  channel = session.submit(prompt)
+  wait_for_prompt(prompt, channel, session, timeout)
+  return decode_images(iter_images(channel.prompt_id, session.server_address, save_previews), shared)
+
+def wait_for_prompt(prompt, channel, session, timeout=None):
+  try:
+    return track_progress(prompt, channel, channel.prompt_id, channel.queued_at, timeout)
+  except PromptTimeout:
+    session.cancel(channel)
+    raise
+  finally:
+    channel.close()
+
+def finish_generation(prompt, channel, session, output_path, save_previews, transcode, metrics, stages=None, timeout=None, postprocessor=None):
+  timings = wait_for_prompt(prompt, channel, session, timeout)
+  start = time.monotonic()
+  saved = download_channel_images(channel, output_path, save_previews, transcode, postprocessor)
+  if metrics is not None:
+    for stage, seconds in (stages or {}).items():
+      timings.record_stage(stage, seconds)
+    # Images are streamed straight to disk, so this covers download and save.
+    timings.record_stage('download', time.monotonic() - start)
+    metrics.record(timings)
+  return saved
+
+def postprocessor_key(postprocessor):
+  return [] if postprocessor is None else postprocessor.key()
+
+def cached_generation(result_cache, key, output_path, save_previews, generate):
+  saved = result_cache.restore(key, output_path, save_previews)
+  if saved is None:
+    saved = generate()
+    # A partial result would be restored as if it were complete.
+    if not saved.failed:
+      result_cache.put(key, saved)
+  return saved
+
+def point_image_loaders(prompt, filename, uploaded_name):
+  prompt = dict(prompt)
+  for node_id, node in prompt.items():
+    if node['class_type'] == 'LoadImage' and node['inputs'].get('image') == filename:
+      prompt[node_id] = dict(node, inputs=dict(node['inputs'], image=uploaded_name))
+  return prompt
+
+def stream_websocket_images(prompt, session=None, include_previews=False, timings=None, timeout=None):
+  session = session or get_session()
+  prompt, output_node_ids = use_websocket_output(prompt)
+  channel = session.submit(prompt)
+  try:
+    yield from iter_websocket_images(channel, channel.prompt_id, output_node_ids, include_previews, channel.queued_at, timings, timeout)
+  except PromptTimeout:
+    session.cancel(channel)
+    raise
+  finally:
+    channel.close()
+
+def output_directory(output_path, image_type, save_previews):
+  return os.path.join(output_path, 'temp/') if image_type == 'temp' and save_previews else output_path
+
+def save_image(images, output_path, save_previews, transcode=None, postprocessor=None):
+    if postprocessor is not None:
+        return postprocessor.process(images, output_path, save_previews)
+    saved = SavedImages()
+    for itm in images:
+        directory = output_directory(output_path, itm['type'], save_previews)
+        os.makedirs(directory, exist_ok=True)
+        destination = os.path.join(directory, itm['file_name'])
+        try:
+            if transcode is None:
+                with atomic_open(destination) as file:
+                    file.write(itm['image_data'])
+            else:
+                destination = transcode_image(io.BytesIO(itm['image_data']), destination, transcode)
+        except Exception as e:
+            print(f"Failed to save image {itm['file_name']}: {e}")
+            saved.failed += 1
+            continue
+        saved.append({'file_name': os.path.basename(destination), 'type': itm['type'], 'path': destination})
+    return saved
+
+def download_images(prompt_id, server_address, output_path, allow_preview=False, transcode=None, postprocessor=None, history=None):
+  # Streams every output of a finished prompt straight to disk. The bytes are
+  # kept as ComfyUI wrote them (including the embedded workflow metadata) unless
+  # a transcode such as {'format': 'webp', 'quality': 85} is requested. With a
+  # postprocessor each image is handed to it as soon as it is downloaded.
+  # Pass the prompt's /history entry as `history` if it is already known.
+  if postprocessor is not None:
+    return postprocessor.process(iter_images(prompt_id, server_address, allow_preview, history), output_path, allow_preview)
+  saved = SavedImages()
+  history = get_history(prompt_id, server_address)[prompt_id] if history is None else history
+  for node_output in history['outputs'].values():
+    for image in node_output.get('images', []):
+      if image['type'] != 'output' and not (allow_preview and image['type'] == 'temp'):
+        continue
+      directory = output_directory(output_path, image['type'], allow_preview)
+      os.makedirs(directory, exist_ok=True)
+      destination = os.path.join(directory, image['filename'])
+      try:
+        if transcode is None:
+          download_image(image['filename'], image['subfolder'], image['type'], server_address, destination)
+        else:
+          data = get_image(image['filename'], image['subfolder'], image['type'], server_address)
+          destination = transcode_image(io.BytesIO(data), destination, transcode)
+      except Exception as e:
+        print(f"Failed to save image {image['filename']}: {e}")
+        saved.failed += 1
+        continue
+      saved.append({'file_name': os.path.basename(destination), 'type': image['type'], 'path': destination})
+  return saved
+
+def download_channel_images(channel, output_path, allow_preview=False, transcode=None, postprocessor=None):
+  # download_images for the prompt of a finished session channel. The images
+  # of a run several coalesced prompts share are fetched once, kept in memory
+  # and saved for each of them with its own options; everything else is
+  # streamed to disk as usual.
+  flight = channel.flight
+  if flight is None or flight.waiters < 2:
+    return download_images(channel.prompt_id, channel.session.server_address, output_path, allow_preview, transcode, postprocessor)
+  with flight.download_lock:
+    if allow_preview not in flight.images:
+      flight.images[allow_preview] = list(iter_images(channel.prompt_id, channel.session.server_address, allow_preview))
+    images = flight.images[allow_preview]
+  return save_image(images, output_path, allow_preview, transcode, postprocessor)
+
+def transcode_image(source, destination, transcode):
+  from PIL import Image # only needed when re-encoding
+  image_format = transcode['format'].lower()
+  destination = os.path.splitext(destination)[0] + TRANSCODE_EXTENSIONS.get(image_format, '.' + image_format)
+  image = Image.open(source)
+  if image_format in ('jpeg', 'jpg'):
+    image_format = 'jpeg'
+    if image.mode not in ('RGB', 'L'):
+      image = image.convert('RGB')
+  with atomic_open(destination) as file:
+    image.save(file, format=image_format.upper(), quality=transcode.get('quality', 90))
+  return destination
+
+def track_progress(prompt, ws, prompt_id, queued_at=None, timeout=None):
+  # Raises ExecutionError / ExecutionInterrupted as soon as the server reports
+  # them, and PromptTimeout when the prompt is not done `timeout` seconds after
+  # it was queued.
+  node_ids = list(prompt.keys())
+  finished_nodes = set()
+  timings = PromptTimings(prompt, prompt_id)
+
+  for event in iter_progress_events(ws, prompt_id, queued_at, timeout):
+      timings.observe(event)
+      raise_for_event(event)
+      if event.kind == 'progress':
+          print('In K-Sampler -> Step: ', event.data['value'], ' of: ', event.data['max'])
+      if event.kind == 'cached':
+          for itm in event.data['nodes']:
+              if itm not in finished_nodes:
+                  finished_nodes.add(itm)
+                  print('Progess: ', len(finished_nodes), '/', len(node_ids), ' Tasks done')
+      if event.kind == 'executing':
+          if event.node not in finished_nodes:
+              finished_nodes.add(event.node)
+              print('Progess: ', len(finished_nodes), '/', len(node_ids), ' Tasks done')
+  return timings
+
+def iter_images(prompt_id, server_address, allow_preview=False, history=None):
+  # Like get_images, but yields each image as soon as it is fetched.
+  history = get_history(prompt_id, server_address)[prompt_id] if history is None else history
+  for node_output in history['outputs'].values():
+    for image in node_output.get('images', []):
+      if image['type'] == 'output' or (allow_preview and image['type'] == 'temp'):
+        image_data = get_image(image['filename'], image['subfolder'], image['type'], server_address)
+        yield {'image_data': image_data, 'file_name': image['filename'], 'type': image['type']}
+
+def get_images(prompt_id, server_address, allow_preview = False):
+  output_images = []
+
+  history = get_history(prompt_id, server_address)[prompt_id]
+  for node_id in history['outputs']:
+      node_output = history['outputs'][node_id]
+      output_data = {}
+      if 'images' in node_output:
+          for image in node_output['images']:
+              if allow_preview and image['type'] == 'temp':
+                  preview_data = get_image(image['filename'], image['subfolder'], image['type'], server_address)
+                  output_data['image_data'] = preview_data
+              if image['type'] == 'output':
+                  image_data = get_image(image['filename'], image['subfolder'], image['type'], server_address)
+                  output_data['image_data'] = image_data
+      output_data['file_name'] = image['filename']
+      output_data['type'] = image['type']
+      output_images.append(output_data)
+
+  return output_images
+
+
+def clear(server_address='127.0.0.1:8188', unload_models=False, free_memory=False):
+  # Prefer api.model_scheduler.ModelScheduler, which calls /free only when the
+  # model changes or VRAM runs low.
+  clear_comfy_cache(server_address, unload_models, free_memory)
\ No newline at end of file
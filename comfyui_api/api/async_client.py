@@ -0,0 +1,145 @@
+import asyncio
+import json
+import uuid
+from contextlib import asynccontextmanager
+import aiohttp
+
+from comfyui_api.api.api_helpers import save_image
+from comfyui_api.api.exceptions import ExecutionError, ExecutionInterrupted
+from comfyui_api.api.image_input import is_path, image_bytes, peek, seekable, sniff
+
+# Coroutine counterparts of api.websocket_api / api.api_helpers. Every call takes
+# an optional aiohttp.ClientSession as `http`; pass one in to reuse connections,
+# otherwise a short-lived session is created for the call.
+
+@asynccontextmanager
+async def _client(http):
+  if http is not None:
+    yield http
+  else:
+    async with aiohttp.ClientSession() as http:
+      yield http
+
+async def upload_image(input_path, name, server_address, image_type="input", overwrite=False, http=None):
+  # Accepts the same sources as websocket_api.upload_image.
+  if is_path(input_path):
+    with open(input_path, 'rb') as file:
+      return await _upload(file, name, server_address, image_type, overwrite, http)
+  if not seekable(input_path):
+    input_path = image_bytes(input_path)
+  return await _upload(input_path, name, server_address, image_type, overwrite, http)
+
+async def _upload(body, name, server_address, image_type, overwrite, http):
+  form = aiohttp.FormData()
+  form.add_field('image', body, filename=name, content_type=sniff(body[:12] if isinstance(body, bytes) else peek(body))[0])
+  form.add_field('type', image_type)
+  form.add_field('overwrite', str(overwrite).lower())
+  async with _client(http) as http:
+    async with http.post("http://{}/upload/image".format(server_address), data=form) as response:
+      response.raise_for_status()
+      return await response.read()
+
+async def queue_prompt(prompt, client_id, server_address, http=None, front=False):
+  p = {"prompt": prompt, "client_id": client_id}
+  if front:
+    p["front"] = True
+  async with _client(http) as http:
+    async with http.post("http://{}/prompt".format(server_address), json=p) as response:
+      response.raise_for_status()
+      return await response.json()
+
+async def interupt_prompt(server_address, http=None):
+  async with _client(http) as http:
+    async with http.post("http://{}/interrupt".format(server_address)) as response:
+      response.raise_for_status()
+      return await response.read()
+
+async def get_image(filename, subfolder, folder_type, server_address, http=None):
+  data = {"filename": filename, "subfolder": subfolder, "type": folder_type}
+  async with _client(http) as http:
+    async with http.get("http://{}/view".format(server_address), params=data) as response:
+      response.raise_for_status()
+      return await response.read()
+
+async def get_history(prompt_id, server_address, http=None):
+  async with _client(http) as http:
+    async with http.get("http://{}/history/{}".format(server_address, prompt_id)) as response:
+      response.raise_for_status()
+      return await response.json()
+
+async def get_node_info_by_class(node_class, server_address, http=None):
+  async with _client(http) as http:
+    async with http.get("http://{}/object_info/{}".format(server_address, node_class)) as response:
+      response.raise_for_status()
+      return await response.json()
+
+async def clear_comfy_cache(server_address, unload_models=False, free_memory=False, http=None):
+  clear_data = {
+    "unload_models": unload_models,
+    "free_memory": free_memory
+  }
+  async with _client(http) as http:
+    async with http.post("http://{}/free".format(server_address), json=clear_data) as response:
+      response.raise_for_status()
+      return await response.read()
+
+async def track_progress(prompt, ws, prompt_id):
+  node_ids = list(prompt.keys())
+  finished_nodes = set()
+
+  async for msg in ws:
+    if msg.type == aiohttp.WSMsgType.TEXT:
+      message = json.loads(msg.data)
+      data = message['data']
+      if message['type'] == 'progress':
+        print('In K-Sampler -> Step: ', data['value'], ' of: ', data['max'])
+      if message['type'] == 'execution_cached':
+        for itm in data['nodes']:
+          if itm not in finished_nodes:
+            finished_nodes.add(itm)
+            print('Progess: ', len(finished_nodes), '/', len(node_ids), ' Tasks done')
+      if message['type'] == 'executing':
+        if data['node'] not in finished_nodes:
+          finished_nodes.add(data['node'])
+          print('Progess: ', len(finished_nodes), '/', len(node_ids), ' Tasks done')
+        if data['node'] is None and data.get('prompt_id') == prompt_id:
+          return #Execution is done
+      if message['type'] == 'execution_error' and data.get('prompt_id') == prompt_id:
+        raise ExecutionError(prompt_id, data)
+      if message['type'] == 'execution_interrupted' and data.get('prompt_id') == prompt_id:
+        raise ExecutionInterrupted(prompt_id, data)
+    elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+      break
+  raise ConnectionError("Websocket closed before prompt {} finished".format(prompt_id))
+
+async def get_images(prompt_id, server_address, allow_preview=False, http=None):
+  history = (await get_history(prompt_id, server_address, http))[prompt_id]
+  wanted = []
+  for node_output in history['outputs'].values():
+    for image in node_output.get('images', []):
+      if image['type'] == 'output' or (allow_preview and image['type'] == 'temp'):
+        wanted.append(image)
+
+  # All outputs of a prompt are fetched concurrently.
+  datas = await asyncio.gather(*[
+    get_image(image['filename'], image['subfolder'], image['type'], server_address, http) for image in wanted
+  ])
+  return [
+    {'image_data': data, 'file_name': image['filename'], 'type': image['type']}
+    for image, data in zip(wanted, datas)
+  ]
+
+async def generate(prompt, server_address='127.0.0.1:8188', output_path=None, save_previews=False, input_path=None, filename=None, http=None):
+  # Queues the prompt, awaits completion and returns the output images. When
+  # output_path is given they are also written to disk (off the event loop).
+  client_id = str(uuid.uuid4())
+  async with _client(http) as http:
+    async with http.ws_connect("ws://{}/ws?clientId={}".format(server_address, client_id)) as ws:
+      if input_path is not None:
+        await upload_image(input_path, filename, server_address, http=http)
+      prompt_id = (await queue_prompt(prompt, client_id, server_address, http))['prompt_id']
+      await track_progress(prompt, ws, prompt_id)
+    images = await get_images(prompt_id, server_address, save_previews, http)
+  if output_path is not None:
+    await asyncio.to_thread(save_image, images, output_path, save_previews)
+  return images
@@ -0,0 +1,18 @@
+import contextlib
+import os
+import tempfile
+
+@contextlib.contextmanager
+def atomic_open(destination):
+  # Writes go to a temporary file next to `destination`, which is renamed over it
+  # once the block succeeds, so readers never see a partially written file.
+  directory = os.path.dirname(destination) or '.'
+  fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.partial-')
+  try:
+    with os.fdopen(fd, 'wb') as file:
+      yield file
+    os.replace(temp_path, destination)
+  except BaseException:
+    if os.path.exists(temp_path):
+      os.unlink(temp_path)
+    raise
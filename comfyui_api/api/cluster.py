@@ -0,0 +1,117 @@
+import http.client
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from comfyui_api.api.api_helpers import track_progress, download_channel_images
+from comfyui_api.api.comfy_session import ComfySession
+from comfyui_api.api.websocket_api import get_queue
+
+def checkpoint_of(prompt):
+  for node in prompt.values():
+    if node['class_type'] == 'CheckpointLoaderSimple':
+      return node['inputs'].get('ckpt_name')
+  return None
+
+class ClusterNode:
+  def __init__(self, server_address, reconnect_attempts):
+    self.server_address = server_address
+    self.alive = True
+    self.queue_depth = 0
+    self.in_flight = 0
+    # The last checkpoint we sent to this node, i.e. most likely still in VRAM.
+    self.checkpoint = None
+    self._reconnect_attempts = reconnect_attempts
+    self._session = None
+
+  def load(self):
+    # The polled depth includes other clients' jobs; our own count is fresher.
+    return max(self.queue_depth, self.in_flight)
+
+  def session(self):
+    if self._session is None:
+      self._session = ComfySession(self.server_address, reconnect_attempts=self._reconnect_attempts)
+    return self._session.connect()
+
+  def mark_dead(self):
+    self.alive = False
+    if self._session is not None:
+      self._session.close()
+      self._session = None
+
+class ComfyCluster:
+  # Dispatches prompts over several ComfyUI servers. Each prompt goes to the
+  # alive node with the lowest load, where a node that does not have the
+  # prompt's checkpoint loaded counts as `affinity_weight` extra queued jobs.
+  # If a node dies mid-job the prompt is resubmitted elsewhere.
+  def __init__(self, server_addresses, poll_interval=2.0, affinity_weight=1, max_attempts=3, reconnect_attempts=2):
+    self.nodes = [ClusterNode(address, reconnect_attempts) for address in server_addresses]
+    self.poll_interval = poll_interval
+    self.affinity_weight = affinity_weight
+    self.max_attempts = max_attempts
+    self._lock = threading.Lock()
+    self._last_poll = 0
+
+  def close(self):
+    for node in self.nodes:
+      if node._session is not None:
+        node._session.close()
+        node._session = None
+
+  def poll(self):
+    for node in self.nodes:
+      try:
+        queue = get_queue(node.server_address)
+      except (OSError, http.client.HTTPException, ValueError):
+        node.alive = False
+        continue
+      node.alive = True
+      node.queue_depth = len(queue.get('queue_running', [])) + len(queue.get('queue_pending', []))
+    self._last_poll = time.monotonic()
+
+  def pick(self, prompt, exclude=()):
+    if time.monotonic() - self._last_poll > self.poll_interval:
+      self.poll()
+    checkpoint = checkpoint_of(prompt)
+    with self._lock:
+      candidates = [node for node in self.nodes if node.alive and node not in exclude]
+      if not candidates:
+        raise ConnectionError("No ComfyUI server available")
+      node = min(candidates, key=lambda n: n.load() + (0 if n.checkpoint == checkpoint else self.affinity_weight))
+      node.in_flight += 1
+      node.checkpoint = checkpoint
+    return node
+
+  def generate(self, prompt, output_path, save_previews=False, transcode=None):
+    failed = []
+    for _ in range(self.max_attempts):
+      node = self.pick(prompt, failed)
+      try:
+        session = node.session()
+        channel = session.submit(prompt)
+        try:
+          track_progress(prompt, channel, channel.prompt_id)
+        finally:
+          channel.close()
+        images = download_channel_images(channel, output_path, save_previews, transcode)
+      except urllib.error.HTTPError:
+        raise # the server rejected the prompt itself; another node would too
+      except (OSError, http.client.HTTPException) as e:
+        print(f"ComfyUI at {node.server_address} failed, resubmitting: {e}")
+        node.mark_dead()
+        failed.append(node)
+        continue
+      finally:
+        with self._lock:
+          node.in_flight -= 1
+      return {'server_address': node.server_address, 'prompt_id': channel.prompt_id, 'images': [itm['file_name'] for itm in images]}
+    raise ConnectionError("Prompt failed on {} servers".format(len(failed)))
+
+  def map(self, prompts, output_path, save_previews=False, max_workers=None):
+    # Runs every prompt across the cluster and yields results in completion order.
+    max_workers = max_workers or 2 * len(self.nodes)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+      futures = [executor.submit(self.generate, prompt, output_path, save_previews) for prompt in prompts]
+      for future in as_completed(futures):
+        yield future.result()
@@ -0,0 +1,436 @@
+import json
+import queue
+import threading
+import time
+import uuid
+
+from comfyui_api.api.exceptions import ExecutionError, ExecutionInterrupted
+from comfyui_api.api.websocket_api import queue_prompt, get_history, get_queue, cancel_prompt
+
+# Messages for a prompt_id we have not subscribed yet (they can arrive before the
+# /prompt response does) are parked for this many seconds before being dropped.
+ORPHAN_TTL = 60
+
+# How often prompts picked up again with reattach() are looked up in /history.
+HISTORY_POLL_INTERVAL = 2.0
+
+class PromptChannel:
+  # Per-prompt mailbox. It mimics the recv()/close() interface of a websocket so
+  # track_progress can consume it exactly like a dedicated connection.
+  def __init__(self, session, prompt_id, completions=None):
+    self.session = session
+    self.prompt_id = prompt_id
+    self.messages = queue.Queue()
+    self.done = threading.Event()
+    self.error = None
+    self.queued_at = None
+    # Arrival time of the message last returned by recv(), so events replayed
+    # from a finished channel keep their real timing.
+    self.received_at = None
+    # Optional queue shared by several channels; each one is put there once it
+    # finishes, which lets callers wait for "any" prompt in completion order.
+    self.completions = completions
+    # The _Flight this channel shares with identical prompts, if coalesced.
+    self.flight = None
+
+  def put(self, out):
+    self.messages.put((time.monotonic(), out))
+
+  def recv(self, timeout=None):
+    try:
+      self.received_at, out = self.messages.get(timeout=timeout)
+    except queue.Empty:
+      raise TimeoutError("No message for prompt {} within {}s".format(self.prompt_id, timeout))
+    if isinstance(out, Exception):
+      raise out
+    return out
+
+  def close(self):
+    self.session.release(self)
+
+class _Flight:
+  # One queued run shared by every identical prompt submitted while it is in
+  # flight. `log` holds what the run has sent so far, for channels joining late.
+  # `waiters` counts every channel that ever joined, and `images` keeps the
+  # run's images once fetched, so they are downloaded once for all of them.
+  def __init__(self, key):
+    self.key = key
+    self.prompt_id = None
+    self.error = None
+    self.queued = threading.Event()
+    self.channels = []
+    self.log = []
+    self.waiters = 0
+    self.images = {}
+    self.download_lock = threading.Lock()
+
+class ComfySession:
+  def __init__(self, server_address='127.0.0.1:8188', reconnect_attempts=5, reconnect_delay=0.5, client_id=None, validator=None, coalesce=False):
+    # With a PromptValidator every submitted prompt is pruned and checked
+    # against the server's /object_info first.
+    #
+    # With coalesce=True a prompt identical (by prompt_hash) to one still in
+    # flight is not queued again: its channel attaches to the running prompt_id
+    # and receives the same messages. api_helpers.download_channel_images then
+    # fetches the one result once for every caller. stats['runs_saved'] counts
+    # the GPU runs avoided that way.
+    self.server_address = server_address
+    self.client_id = client_id or str(uuid.uuid4())
+    self.reconnect_attempts = reconnect_attempts
+    self.reconnect_delay = reconnect_delay
+    self.queue_remaining = None
+    self._lock = threading.Lock()
+    self._channels = {}
+    self._orphans = {}
+    self._executing = None
+    self._ws = None
+    self._reader = None
+    self._closed = False
+    self._reconnect_listeners = []
+    self._polled = set()
+    self._poller = None
+    self._flights = {}
+    self.coalesce = coalesce
+    self.stats = {'prompts_queued': 0, 'runs_saved': 0}
+    self.validator = validator
+    if validator is not None:
+      validator.watch(self)
+
+  def __enter__(self):
+    return self.connect()
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def connect(self):
+    with self._lock:
+      if self._reader is None or not self._reader.is_alive():
+        self._closed = False
+        self._ws = self._open()
+        self._reader = threading.Thread(target=self._read_loop, name='comfy-session-reader', daemon=True)
+        self._reader.start()
+    return self
+
+  def close(self):
+    # Prompts still in flight are not cancelled on the server, but whoever
+    # waits on their channels gets a ConnectionError instead of hanging.
+    self._closed = True
+    if self._ws is not None:
+      self._ws.close()
+    if self._reader is not None and self._reader is not threading.current_thread():
+      self._reader.join(timeout=5)
+    self._fail_all(ConnectionError("Session to {} closed".format(self.server_address)))
+
+  def submit(self, prompt, completions=None, front=False):
+    if self.validator is not None:
+      prompt = self.validator.prepare(prompt, self.server_address)
+    self.connect()
+    if self.coalesce:
+      return self._submit_coalesced(prompt, completions, front)
+    queued_at = time.monotonic()
+    prompt_id = queue_prompt(prompt, self.client_id, self.server_address, front)['prompt_id']
+    with self._lock:
+      self.stats['prompts_queued'] += 1
+    channel = self.subscribe(prompt_id, completions)
+    channel.queued_at = queued_at
+    return channel
+
+  def _submit_coalesced(self, prompt, completions, front=False):
+    from comfyui_api.api.result_cache import prompt_hash # result_cache imports api_helpers, which imports this module
+    key = prompt_hash(prompt)
+    queued_at = time.monotonic()
+    with self._lock:
+      flight = self._flights.get(key)
+      leader = flight is None
+      if leader:
+        flight = self._flights[key] = _Flight(key)
+    if not leader:
+      flight.queued.wait()
+      if flight.error is not None:
+        raise flight.error
+      with self._lock:
+        if self._flights.get(key) is flight:
+          channel = PromptChannel(self, flight.prompt_id, completions)
+          channel.queued_at = queued_at
+          channel.flight = flight
+          for out in flight.log:
+            self._deliver_one(channel, out)
+          flight.channels.append(channel)
+          flight.waiters += 1
+          self.stats['runs_saved'] += 1
+          return channel
+      # The run finished, or every waiter left it, before we could join.
+      return self._submit_coalesced(prompt, completions, front)
+    try:
+      prompt_id = queue_prompt(prompt, self.client_id, self.server_address, front)['prompt_id']
+    except Exception as e:
+      with self._lock:
+        del self._flights[key]
+      flight.error = e
+      flight.queued.set()
+      raise
+    with self._lock:
+      self.stats['prompts_queued'] += 1
+      flight.prompt_id = prompt_id
+      channel = PromptChannel(self, prompt_id, completions)
+      channel.queued_at = queued_at
+      channel.flight = flight
+      flight.channels.append(channel)
+      flight.waiters += 1
+      self._channels[prompt_id] = channel
+      for _, out in self._orphans.pop(prompt_id, []):
+        self._deliver(channel, out)
+    flight.queued.set()
+    return channel
+
+  def subscribe(self, prompt_id, completions=None):
+    with self._lock:
+      channel = self._channels.get(prompt_id)
+      if channel is None:
+        channel = PromptChannel(self, prompt_id, completions)
+        self._channels[prompt_id] = channel
+        for _, out in self._orphans.pop(prompt_id, []):
+          self._deliver(channel, out)
+    return channel
+
+  def reattach(self, prompt_id, completions=None):
+    # Picks up a prompt queued earlier, e.g. by a process that crashed. ComfyUI
+    # only sends progress to the client id that queued it, so completion is
+    # detected by polling /history. Returns None if the server no longer knows
+    # the prompt (it restarted), in which case it has to be submitted again.
+    self.connect()
+    channel = self.subscribe(prompt_id, completions)
+    if self._replay_if_finished(channel):
+      return channel
+    queue_state = get_queue(self.server_address)
+    queued = [item[1] for key in ('queue_running', 'queue_pending') for item in queue_state.get(key, [])]
+    if prompt_id not in queued and not self._replay_if_finished(channel):
+      self.release(channel)
+      return None
+    with self._lock:
+      self._polled.add(channel)
+      if self._poller is None or not self._poller.is_alive():
+        self._poller = threading.Thread(target=self._poll_history, name='comfy-session-poller', daemon=True)
+        self._poller.start()
+    return channel
+
+  def add_reconnect_listener(self, listener):
+    # Called with the session after the websocket had to be re-established,
+    # which usually means the server restarted.
+    self._reconnect_listeners.append(listener)
+
+  def cancel(self, channel):
+    # Drops the prompt from the server queue or interrupts it, and wakes up
+    # anyone waiting on the channel right away.
+    # A coalesced prompt other callers still wait for is only left, not
+    # cancelled; that returns 'detached'.
+    with self._lock:
+      shared = channel.flight is not None and any(member is not channel for member in channel.flight.channels)
+      if shared:
+        self._leave(channel)
+    result = 'detached' if shared else cancel_prompt(channel.prompt_id, self.server_address)
+    message = json.dumps({'type': 'execution_interrupted', 'data': {'prompt_id': channel.prompt_id}})
+    with self._lock:
+      if not channel.done.is_set():
+        if shared:
+          self._deliver_one(channel, message)
+        else:
+          self._deliver(channel, message)
+    return result
+
+  def release(self, channel):
+    with self._lock:
+      self._leave(channel)
+
+  def _leave(self, channel):
+    flight = channel.flight
+    members = flight.channels if flight is not None else []
+    if channel in members:
+      members.remove(channel)
+    if flight is not None and not members and self._flights.get(flight.key) is flight:
+      del self._flights[flight.key]
+    if self._channels.get(channel.prompt_id) is channel:
+      if members:
+        self._channels[channel.prompt_id] = members[0]
+      else:
+        del self._channels[channel.prompt_id]
+
+  def _open(self):
+    import websocket #NOTE: websocket-client (https://github.com/websocket-client/websocket-client)
+    ws = websocket.WebSocket()
+    ws.connect("ws://{}/ws?clientId={}".format(self.server_address, self.client_id))
+    return ws
+
+  def _read_loop(self):
+    while not self._closed:
+      try:
+        out = self._ws.recv()
+        if out == '':
+          raise ConnectionError("Connection closed by server")
+      except Exception as e:
+        if self._closed:
+          break
+        if not self._reconnect():
+          self._fail_all(ConnectionError("Lost connection to {}: {}".format(self.server_address, e)))
+          break
+        continue
+      self._route(out)
+
+  def _reconnect(self):
+    delay = self.reconnect_delay
+    for _ in range(self.reconnect_attempts):
+      time.sleep(delay)
+      if self._closed:
+        return False
+      try:
+        self._ws = self._open()
+      except Exception:
+        delay *= 2
+        continue
+      for listener in self._reconnect_listeners:
+        listener(self)
+      self._resync()
+      return True
+    return False
+
+  def _resync(self):
+    # Completion messages sent while we were disconnected are lost. Anything that
+    # already shows up in /history finished in the meantime, so replay its end.
+    with self._lock:
+      pending = list(self._channels.values())
+    for channel in pending:
+      try:
+        self._replay_if_finished(channel)
+      except Exception:
+        continue
+
+  def _replay_if_finished(self, channel):
+    history = get_history(channel.prompt_id, self.server_address).get(channel.prompt_id)
+    if history is None:
+      return False
+    messages = []
+    status = history.get('status') or {}
+    for name, data in status.get('messages', []):
+      if name in ('execution_error', 'execution_interrupted'):
+        messages.append({'type': name, 'data': data})
+    messages.append({'type': 'executing', 'data': {'node': None, 'prompt_id': channel.prompt_id}})
+    with self._lock:
+      if not channel.done.is_set():
+        for message in messages:
+          self._deliver(channel, json.dumps(message))
+    return True
+
+  def _poll_history(self):
+    while not self._closed:
+      with self._lock:
+        channels = [channel for channel in self._polled if not channel.done.is_set()]
+        self._polled = set(channels)
+        if not channels:
+          self._poller = None
+          return
+      for channel in channels:
+        try:
+          self._replay_if_finished(channel)
+        except Exception:
+          continue
+      time.sleep(HISTORY_POLL_INTERVAL)
+
+  def _fail_all(self, error):
+    with self._lock:
+      channels = [member for channel in self._channels.values() for member in self._members(channel)]
+      self._channels.clear()
+      self._orphans.clear()
+      self._flights.clear()
+      for channel in channels:
+        # Finished prompts keep their result; they are already on completions.
+        if channel.done.is_set():
+          continue
+        channel.error = error
+        channel.put(error)
+        channel.done.set()
+        if channel.completions is not None:
+          channel.completions.put(channel)
+    self._reader = None
+
+  def _route(self, out):
+    if not isinstance(out, str):
+      # Binary frames (previews) carry no prompt_id; they belong to whatever runs now.
+      with self._lock:
+        channel = self._channels.get(self._executing)
+        if channel is not None:
+          self._deliver(channel, out)
+        elif self._executing is not None:
+          # With websocket output this may be the final image of a fast run.
+          self._park(self._executing, out)
+      return
+
+    message = json.loads(out)
+    data = message.get('data') or {}
+    if message['type'] == 'status':
+      self.queue_remaining = data.get('status', {}).get('exec_info', {}).get('queue_remaining')
+      return
+
+    with self._lock:
+      prompt_id = data.get('prompt_id', self._executing)
+      if message['type'] == 'executing':
+        self._executing = prompt_id if data.get('node') is not None else None
+      if prompt_id is None:
+        return
+      channel = self._channels.get(prompt_id)
+      if channel is not None:
+        self._deliver(channel, out)
+      else:
+        self._park(prompt_id, out)
+
+  def _members(self, channel):
+    return list(channel.flight.channels) if channel.flight is not None else [channel]
+
+  def _deliver(self, channel, out):
+    flight = channel.flight
+    if flight is None:
+      return self._deliver_one(channel, out)
+    members = self._members(channel)
+    for member in members:
+      self._deliver_one(member, out)
+    if not members or members[0].done.is_set():
+      # Finished: later identical prompts start a new run.
+      if self._flights.get(flight.key) is flight:
+        del self._flights[flight.key]
+      flight.log = []
+    else:
+      flight.log.append(out)
+
+  def _deliver_one(self, channel, out):
+    channel.put(out)
+    if not isinstance(out, str):
+      return # a binary preview frame
+    message = json.loads(out)
+    data = message.get('data') or {}
+    if message['type'] == 'execution_error':
+      channel.error = ExecutionError(channel.prompt_id, data)
+    elif message['type'] == 'execution_interrupted':
+      channel.error = ExecutionInterrupted(channel.prompt_id, data)
+    elif message['type'] != 'executing' or data.get('node') is not None:
+      return
+    if not channel.done.is_set():
+      channel.done.set()
+      if channel.completions is not None:
+        channel.completions.put(channel)
+
+  def _park(self, prompt_id, out):
+    now = time.monotonic()
+    self._orphans.setdefault(prompt_id, []).append((now, out))
+    expired = [pid for pid, msgs in self._orphans.items() if now - msgs[-1][0] > ORPHAN_TTL]
+    for pid in expired:
+      del self._orphans[pid]
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(server_address='127.0.0.1:8188'):
+  with _sessions_lock:
+    session = _sessions.get(server_address)
+    if session is None:
+      session = ComfySession(server_address)
+      _sessions[server_address] = session
+  return session.connect()
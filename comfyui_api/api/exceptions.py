@@ -0,0 +1,28 @@
+class ExecutionError(Exception):
+  # Raised when ComfyUI reports execution_error for a prompt. `data` is the
+  # message payload (node_id, node_type, exception_message, traceback, ...).
+  def __init__(self, prompt_id, data=None, message=None):
+    data = data or {}
+    self.prompt_id = prompt_id
+    self.node_id = data.get('node_id')
+    self.node_type = data.get('node_type')
+    self.exception_message = data.get('exception_message')
+    self.data = data
+    super().__init__(message or "Prompt {} failed in node {} ({}): {}".format(prompt_id, self.node_id, self.node_type, self.exception_message))
+
+class ExecutionInterrupted(ExecutionError):
+  def __init__(self, prompt_id, data=None):
+    super().__init__(prompt_id, data, "Prompt {} was interrupted".format(prompt_id))
+
+class PromptTimeout(TimeoutError):
+  def __init__(self, prompt_id, timeout):
+    self.prompt_id = prompt_id
+    self.timeout = timeout
+    super().__init__("Prompt {} did not finish within {}s".format(prompt_id, timeout))
+
+class PromptValidationError(ValueError):
+  # Raised before submitting a prompt that ComfyUI would reject. `errors` lists
+  # one message per problem found.
+  def __init__(self, errors):
+    self.errors = list(errors)
+    super().__init__("Invalid prompt:\n  " + "\n  ".join(self.errors))
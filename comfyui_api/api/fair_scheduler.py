@@ -0,0 +1,141 @@
+import collections
+import threading
+import time
+from concurrent.futures import Future
+
+from comfyui_api.api.api_helpers import download_channel_images
+from comfyui_api.api.comfy_session import get_session
+from comfyui_api.api.pipeline import Pipeline
+
+# Priority classes in dispatch order. Interactive prompts are queued with
+# ComfyUI's front flag so they also overtake whatever is already on the server.
+INTERACTIVE = 'interactive'
+STANDARD = 'standard'
+BATCH = 'batch'
+PRIORITY_CLASSES = (INTERACTIVE, STANDARD, BATCH)
+
+# Latency samples kept per class for the percentiles.
+MAX_SAMPLES = 10000
+
+def percentile(samples, fraction):
+  ordered = sorted(samples)
+  return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+class FairScheduler:
+  # Holds jobs client-side and keeps at most `window` prompts on the server.
+  # ComfyUI runs its queue in order, so a shallow server queue is what lets a
+  # job submitted later still run sooner. Classes are served by strict
+  # priority. Within a class, tenants get weighted fair shares: the tenant
+  # with the least service relative to its weight (default 1) goes next, and
+  # a tenant that becomes active starts level with the others rather than
+  # with credit for its idle time. Interactive jobs get their own window on
+  # top of the shared one, so they never wait for a batch prompt to leave.
+  #
+  # submit() returns a Future for the list of saved images. latency() reports
+  # p50/p99 per class, from submit() until the images are saved.
+  def __init__(self, session=None, window=2, weights=None, output_path='./output/', save_previews=False, transcode=None):
+    self.session = session or get_session()
+    self.window = window
+    self.weights = dict(weights or {})
+    self.output_path = output_path
+    self.save_previews = save_previews
+    self.transcode = transcode
+    self._lock = threading.Lock()
+    self._pipeline = Pipeline(raise_errors=False)
+    self._queues = {priority: collections.OrderedDict() for priority in PRIORITY_CLASSES}
+    self._virtual = {priority: {} for priority in PRIORITY_CLASSES}
+    self._clock = dict.fromkeys(PRIORITY_CLASSES, 0.0)
+    self._latencies = {priority: collections.deque(maxlen=MAX_SAMPLES) for priority in PRIORITY_CLASSES}
+    self._closed = False
+    self._worker = threading.Thread(target=self._run, name='fair-scheduler', daemon=True)
+    self._worker.start()
+
+  def submit(self, prompt, tenant='default', priority=STANDARD):
+    if priority not in self._queues:
+      raise ValueError("Unknown priority class {!r}, expected one of {}".format(priority, ', '.join(PRIORITY_CLASSES)))
+    future = Future()
+    with self._lock:
+      if self._closed:
+        raise RuntimeError("FairScheduler is closed")
+      tenants = self._queues[priority]
+      if tenant not in tenants:
+        tenants[tenant] = collections.deque()
+        # Idle time earns no credit.
+        self._virtual[priority][tenant] = max(self._virtual[priority].get(tenant, 0.0), self._clock[priority])
+      tenants[tenant].append((prompt, future, time.monotonic()))
+    self._pipeline.wake()
+    return future
+
+  def pending(self):
+    with self._lock:
+      return {priority: sum(len(jobs) for jobs in tenants.values()) for priority, tenants in self._queues.items()}
+
+  def latency(self):
+    # {class: {'count', 'p50', 'p99'}} in seconds, for classes with samples.
+    with self._lock:
+      samples = {priority: list(latencies) for priority, latencies in self._latencies.items() if latencies}
+    return {priority: {'count': len(values), 'p50': percentile(values, 0.5), 'p99': percentile(values, 0.99)} for priority, values in samples.items()}
+
+  def close(self, wait=True):
+    # Stops accepting jobs. With wait=True, returns once everything submitted
+    # has finished.
+    with self._lock:
+      self._closed = True
+    self._pipeline.wake()
+    if wait:
+      self._worker.join()
+
+  def _next_job(self):
+    # Called with the lock held.
+    interactive = sum(1 for job in self._pipeline.in_flight.values() if job[0] == INTERACTIVE)
+    shared = len(self._pipeline) - interactive
+    for priority, tenants in self._queues.items():
+      if not tenants or (shared if priority != INTERACTIVE else interactive) >= self.window:
+        continue
+      virtual = self._virtual[priority]
+      tenant = min(tenants, key=lambda name: virtual[name])
+      self._clock[priority] = virtual[tenant]
+      virtual[tenant] += 1.0 / self.weights.get(tenant, 1)
+      prompt, future, submitted = tenants[tenant].popleft()
+      if not tenants[tenant]:
+        del tenants[tenant]
+      return priority, prompt, future, submitted
+    return None
+
+  def _dispatch(self):
+    while True:
+      with self._lock:
+        job = self._next_job()
+      if job is None:
+        return
+      priority, prompt, future, submitted = job
+      if not future.set_running_or_notify_cancel():
+        continue
+      try:
+        self._pipeline.submit(self.session, prompt, (priority, future, submitted), front=priority == INTERACTIVE)
+      except Exception as e:
+        future.set_exception(e)
+
+  def _run(self):
+    while True:
+      self._dispatch()
+      with self._lock:
+        if self._closed and not self._pipeline and not any(self._queues.values()):
+          return
+      finished = self._pipeline.next_finished()
+      if finished is None:
+        continue # woken up by submit() or close()
+      (priority, future, submitted), channel = finished
+      # Refill the window before touching the network or disk for this result.
+      self._dispatch()
+      if channel.error is not None:
+        future.set_exception(channel.error)
+        continue
+      try:
+        images = download_channel_images(channel, self.output_path, self.save_previews, self.transcode)
+      except Exception as e:
+        future.set_exception(e)
+        continue
+      with self._lock:
+        self._latencies[priority].append(time.monotonic() - submitted)
+      future.set_result(images)
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+
+from comfyui_api.api.api_helpers import download_channel_images
+from comfyui_api.api.comfy_session import ComfySession
+from comfyui_api.api.exceptions import PromptTimeout
+from comfyui_api.api.progress import iter_progress_events, raise_for_event
+from comfyui_api.utils.helpers.workflow_template import as_template
+
+# HTTP front end for long-running services. Requests are admitted into a
+# bounded queue (429 once it is full) and executed by a fixed set of workers
+# over persistent ComfyUI sessions, so no request pays for connection setup.
+# Results are fetched by job id, by polling or as server-sent events.
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+class Job:
+  def __init__(self, job_id, prompt):
+    self.job_id = job_id
+    self.prompt = prompt
+    self.status = QUEUED
+    self.prompt_id = None
+    self.channel = None
+    self.server_address = None
+    self.images = []
+    self.error = None
+    self.created = time.time()
+    self.finished = None
+    self.subscribers = set()
+
+  def to_json(self):
+    return {
+      'job_id': self.job_id,
+      'status': self.status,
+      'prompt_id': self.prompt_id,
+      'server_address': self.server_address,
+      'images': ['/jobs/{}/images/{}'.format(self.job_id, name) for name in self.images],
+      'error': self.error,
+      'created': self.created,
+      'finished': self.finished
+    }
+
+  def publish(self, event, data):
+    for subscriber in self.subscribers:
+      subscriber.put_nowait((event, data))
+
+class Gateway:
+  # workers_per_server prompts are kept in flight per ComfyUI server; two is
+  # enough to have the next prompt queued while one runs. Finished jobs are
+  # kept for polling until max_finished newer ones have finished. With
+  # coalesce=True identical jobs in flight at the same time share one run.
+  def __init__(self, server_addresses=('127.0.0.1:8188',), max_queue=100, workers_per_server=2, output_path='./output/', job_timeout=None, max_finished=1000, transcode=None, coalesce=False):
+    self.server_addresses = list(server_addresses)
+    self.max_queue = max_queue
+    self.workers_per_server = workers_per_server
+    self.output_path = output_path
+    self.job_timeout = job_timeout
+    self.max_finished = max_finished
+    self.transcode = transcode
+    self.coalesce = coalesce
+    self.jobs = {}
+    self._finished = OrderedDict()
+    self._queue = None
+    self._sessions = []
+    self._workers = []
+    self._executor = None
+    self._loop = None
+
+  def app(self):
+    app = web.Application()
+    app.router.add_post('/jobs', self.create_job)
+    app.router.add_get('/jobs/{job_id}', self.get_job)
+    app.router.add_get('/jobs/{job_id}/events', self.job_events)
+    app.router.add_get('/jobs/{job_id}/images/{name}', self.job_image)
+    app.router.add_get('/health', self.health)
+    app.on_startup.append(self._start)
+    app.on_cleanup.append(self._stop)
+    return app
+
+  async def _start(self, app):
+    self._loop = asyncio.get_running_loop()
+    self._queue = asyncio.Queue(self.max_queue)
+    self._executor = ThreadPoolExecutor(len(self.server_addresses) * self.workers_per_server, thread_name_prefix='gateway-worker')
+    for address in self.server_addresses:
+      session = ComfySession(address, coalesce=self.coalesce)
+      self._sessions.append(session)
+      for _ in range(self.workers_per_server):
+        self._workers.append(asyncio.ensure_future(self._work(session)))
+
+  async def _stop(self, app):
+    for worker in self._workers:
+      worker.cancel()
+    await asyncio.gather(*self._workers, return_exceptions=True)
+    # Executor threads are blocked on their channels: cancel the prompts on
+    # the servers, then closing the sessions fails the channels and frees them.
+    for job in list(self.jobs.values()):
+      channel = job.channel
+      if channel is not None:
+        try:
+          channel.session.cancel(channel)
+        except Exception as e:
+          print(f"Could not cancel prompt {channel.prompt_id}: {e}")
+    for session in self._sessions:
+      session.close()
+    self._executor.shutdown(wait=True)
+
+  async def create_job(self, request):
+    # Body: {"prompt": {...API format graph...}} with optional "positive",
+    # "negative" and "seed", which are applied like prompt_to_image does.
+    try:
+      body = await request.json()
+      prompt = body['prompt']
+      if any(key in body for key in ('positive', 'negative', 'seed')):
+        prompt = as_template(prompt).render(body.get('positive'), body.get('negative'), seed=body.get('seed'))
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+      return web.json_response({'error': 'invalid request: {}'.format(e)}, status=400)
+    job = Job(uuid.uuid4().hex, prompt)
+    try:
+      self._queue.put_nowait(job)
+    except asyncio.QueueFull:
+      return web.json_response({'error': 'queue is full'}, status=429, headers={'Retry-After': '1'})
+    self.jobs[job.job_id] = job
+    return web.json_response(dict(job.to_json(), position=self._queue.qsize()), status=202)
+
+  def _job(self, request):
+    job = self.jobs.get(request.match_info['job_id'])
+    if job is None:
+      raise web.HTTPNotFound(text=json.dumps({'error': 'unknown job'}), content_type='application/json')
+    return job
+
+  async def get_job(self, request):
+    return web.json_response(self._job(request).to_json())
+
+  async def job_events(self, request):
+    job = self._job(request)
+    response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+    await response.prepare(request)
+    events = asyncio.Queue()
+    job.subscribers.add(events)
+    try:
+      event, data = 'status', job.to_json()
+      while True:
+        await response.write('event: {}\ndata: {}\n\n'.format(event, json.dumps(data)).encode('utf-8'))
+        if event == 'status' and data['status'] in (DONE, FAILED):
+          break
+        event, data = await events.get()
+    finally:
+      job.subscribers.discard(events)
+    return response
+
+  async def job_image(self, request):
+    job = self._job(request)
+    name = request.match_info['name']
+    if name not in job.images:
+      raise web.HTTPNotFound()
+    return web.FileResponse(os.path.join(self.output_path, job.job_id, name))
+
+  async def health(self, request):
+    return web.json_response({
+      'queued': self._queue.qsize(),
+      'max_queue': self.max_queue,
+      'running': sum(1 for job in self.jobs.values() if job.status == RUNNING),
+      'servers': self.server_addresses,
+      'prompts_queued': sum(session.stats['prompts_queued'] for session in self._sessions),
+      'runs_saved': sum(session.stats['runs_saved'] for session in self._sessions)
+    })
+
+  async def _work(self, session):
+    while True:
+      job = await self._queue.get()
+      job.status = RUNNING
+      job.server_address = session.server_address
+      job.publish('status', job.to_json())
+      try:
+        job.images = await self._loop.run_in_executor(self._executor, self._execute, job, session)
+        job.status = DONE
+      except asyncio.CancelledError:
+        raise
+      except Exception as e:
+        job.status = FAILED
+        job.error = str(e)
+      job.finished = time.time()
+      job.publish('status', job.to_json())
+      self._retire(job)
+
+  def _execute(self, job, session):
+    # Runs on a worker thread; progress is handed back to the event loop.
+    channel = session.connect().submit(job.prompt)
+    job.prompt_id = channel.prompt_id
+    job.channel = channel
+    try:
+      for event in iter_progress_events(channel, channel.prompt_id, channel.queued_at, self.job_timeout):
+        raise_for_event(event)
+        if event.kind in ('executing', 'cached', 'progress'):
+          data = {key: value for key, value in event.data.items() if key in ('node', 'nodes', 'value', 'max')}
+          self._loop.call_soon_threadsafe(job.publish, event.kind, data)
+    except PromptTimeout:
+      session.cancel(channel)
+      raise
+    finally:
+      job.channel = None
+      channel.close()
+    saved = download_channel_images(channel, os.path.join(self.output_path, job.job_id), False, self.transcode)
+    return [itm['file_name'] for itm in saved]
+
+  def _retire(self, job):
+    self._finished[job.job_id] = job
+    while len(self._finished) > self.max_finished:
+      old_id, _ = self._finished.popitem(last=False)
+      self.jobs.pop(old_id, None)
+
+def serve(server_addresses=('127.0.0.1:8188',), host='127.0.0.1', port=8000, **options):
+  web.run_app(Gateway(server_addresses, **options).app(), host=host, port=port)
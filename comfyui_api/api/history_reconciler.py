@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+
+from comfyui_api.api.api_helpers import download_images
+from comfyui_api.api.websocket_api import get_histories, get_history, delete_history
+
+# Entries fetched beyond the prompts known to have finished, for other
+# clients' prompts that finished in between.
+HISTORY_SLACK = 2
+
+class HistoryReconciler:
+  # Resolves the outputs of many prompts with one bulk /history?max_items=N
+  # request instead of one /history/{prompt_id} per prompt. Prompts are
+  # track()ed when queued, ideally with their session channel so the
+  # reconciler can tell which of them have finished. When an entry is needed
+  # and several tracked prompts have finished, one bulk refresh picks them all
+  # up; their entries are cached until their images are downloaded. By default
+  # max_items is the number of finished, unresolved prompts plus HISTORY_SLACK,
+  # so older history is not fetched again and again. With only one finished
+  # prompt, or one that has dropped out of that window, the entry is fetched on
+  # its own. Lookups are at least min_interval seconds apart, so prompts that
+  # finish close together share one.
+  #
+  # With delete_after_download the server's history entry is deleted once
+  # every image of the prompt is saved. Deletes are sent delete_batch at a
+  # time; flush() sends the rest. A download that saved only some of the
+  # images keeps the entry, and the next attempt fetches only the missing ones.
+  def __init__(self, server_address, max_items=None, min_interval=0.5, delete_after_download=False, delete_batch=32):
+    self.server_address = server_address
+    self.max_items = max_items
+    self.min_interval = min_interval
+    self.delete_after_download = delete_after_download
+    self.delete_batch = delete_batch
+    self.stats = {'bulk_requests': 0, 'single_requests': 0, 'entries_fetched': 0, 'entries_matched': 0, 'deleted': 0}
+    self._lock = threading.Lock()
+    self._refresh_lock = threading.Lock()
+    self._last_refresh = None
+    self._pending = set()
+    self._channels = {}
+    self._wanted = set()
+    self._entries = {}
+    self._saved = {}
+    self._to_delete = []
+
+  def track(self, prompt_id, channel=None):
+    with self._lock:
+      if prompt_id not in self._entries:
+        self._pending.add(prompt_id)
+        if channel is not None:
+          self._channels[prompt_id] = channel
+
+  def _finished(self):
+    # Called with the lock held: unresolved prompts known to have finished.
+    return [prompt_id for prompt_id in self._pending if prompt_id in self._wanted or (prompt_id in self._channels and self._channels[prompt_id].done.is_set())]
+
+  def refresh(self):
+    # One bulk /history request, matched against the tracked prompts.
+    with self._refresh_lock:
+      return self._refresh()
+
+  def _refresh(self):
+    with self._lock:
+      finished = len(self._finished())
+      if not finished:
+        return 0
+      max_items = self.max_items or finished + HISTORY_SLACK
+    history = get_histories(self.server_address, max_items)
+    self._last_refresh = time.monotonic()
+    with self._lock:
+      self.stats['bulk_requests'] += 1
+      self.stats['entries_fetched'] += len(history)
+      matched = [prompt_id for prompt_id in history if prompt_id in self._pending]
+      for prompt_id in matched:
+        self._pending.discard(prompt_id)
+        self._channels.pop(prompt_id, None)
+        self._entries[prompt_id] = history[prompt_id]
+      self.stats['entries_matched'] += len(matched)
+    return len(matched)
+
+  def entry(self, prompt_id):
+    # The /history entry of a finished prompt, or None if the server has none.
+    self.track(prompt_id)
+    with self._lock:
+      self._wanted.add(prompt_id)
+    with self._refresh_lock:
+      # Whoever held the lock may have refreshed while we waited for it.
+      with self._lock:
+        if prompt_id in self._entries:
+          return self._entries[prompt_id]
+      # Gives prompts finishing right after this one a chance to share the request.
+      if self._last_refresh is not None:
+        time.sleep(max(0, self._last_refresh + self.min_interval - time.monotonic()))
+      with self._lock:
+        bulk = self.max_items is not None or len(self._finished()) > 1
+      if bulk:
+        self._refresh()
+    with self._lock:
+      if prompt_id in self._entries:
+        return self._entries[prompt_id]
+    entry = get_history(prompt_id, self.server_address).get(prompt_id)
+    self._last_refresh = time.monotonic()
+    with self._lock:
+      self.stats['single_requests'] += 1
+      if entry is not None:
+        self.stats['entries_fetched'] += 1
+        self._pending.discard(prompt_id)
+        self._channels.pop(prompt_id, None)
+        self._entries[prompt_id] = entry
+    return entry
+
+  def download_images(self, prompt_id, output_path, allow_preview=False, transcode=None, postprocessor=None):
+    # Like api_helpers.download_images, but the entry comes from the bulk
+    # refresh and images saved by an earlier attempt are not fetched again.
+    entry = self.entry(prompt_id)
+    if entry is None:
+      raise KeyError("Prompt {} is not in the history of {}".format(prompt_id, self.server_address))
+    with self._lock:
+      saved = self._saved.setdefault(prompt_id, {})
+    remaining = {}
+    for node_id, node_output in entry.get('outputs', {}).items():
+      images = [image for image in node_output.get('images', []) if self._image_key(image) not in saved]
+      if images:
+        remaining[node_id] = dict(node_output, images=images)
+    if remaining:
+      results = download_images(prompt_id, self.server_address, output_path, allow_preview, transcode, postprocessor, dict(entry, outputs=remaining))
+      for node_output in remaining.values():
+        for image in node_output['images']:
+          stem = os.path.splitext(image['filename'])[0]
+          matches = [itm for itm in results if itm['type'] == image['type'] and itm['file_name'].startswith(stem)]
+          if matches:
+            saved[self._image_key(image)] = matches
+    wanted = [image for node_output in entry.get('outputs', {}).values() for image in node_output.get('images', []) if image['type'] == 'output' or (allow_preview and image['type'] == 'temp')]
+    if all(self._image_key(image) in saved for image in wanted):
+      self._finish(prompt_id)
+    return [itm for matches in saved.values() for itm in matches]
+
+  def _image_key(self, image):
+    return (image['filename'], image.get('subfolder', ''), image['type'])
+
+  def forget(self, prompt_id):
+    with self._lock:
+      self._pending.discard(prompt_id)
+      self._channels.pop(prompt_id, None)
+      self._wanted.discard(prompt_id)
+      self._entries.pop(prompt_id, None)
+      self._saved.pop(prompt_id, None)
+
+  def _finish(self, prompt_id):
+    self.forget(prompt_id)
+    if not self.delete_after_download:
+      return
+    with self._lock:
+      self._to_delete.append(prompt_id)
+      full = len(self._to_delete) >= self.delete_batch
+    if full:
+      self.flush()
+
+  def flush(self):
+    # Deletes the history entries of every prompt downloaded so far.
+    with self._lock:
+      prompt_ids, self._to_delete = self._to_delete, []
+    if prompt_ids:
+      delete_history(prompt_ids, self.server_address)
+      with self._lock:
+        self.stats['deleted'] += len(prompt_ids)
@@ -0,0 +1,161 @@
+import contextlib
+import http.client
+import io
+import json
+import queue
+import select
+import threading
+import time
+import urllib.error
+import urllib.parse
+
+# Keep-alive connection pools keyed by server_address, shared by every REST call.
+POOL_SIZE = 10
+TIMEOUT = 120 # seconds, applied to connect and to each socket read
+RETRIES = 3
+BACKOFF_FACTOR = 0.3
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+RETRY_STATUSES = (502, 503, 504)
+
+_pools = {}
+_lock = threading.Lock()
+
+class ConnectionPool:
+  def __init__(self, server_address, size, timeout):
+    self.server_address = server_address
+    self.timeout = timeout
+    self._idle = queue.LifoQueue(maxsize=size)
+
+  def _get(self):
+    while True:
+      try:
+        conn = self._idle.get_nowait()
+      except queue.Empty:
+        host, _, port = self.server_address.partition(':')
+        return http.client.HTTPConnection(host, int(port or 80), timeout=self.timeout), False
+      if not dropped(conn):
+        return conn, True
+      conn.close()
+
+  def _put(self, conn):
+    try:
+      self._idle.put_nowait(conn)
+    except queue.Full:
+      conn.close()
+
+  def close(self):
+    while True:
+      try:
+        self._idle.get_nowait().close()
+      except queue.Empty:
+        return
+
+  def request(self, method, path, body=None, headers=None):
+    conn, response, data = self._send(method, path, body, headers, read=True)
+    self._release(conn, response)
+    return data
+
+  @contextlib.contextmanager
+  def stream(self, method, path, headers=None):
+    # Yields the raw HTTPResponse so the body can be consumed in chunks. Opening
+    # it is retried like request(); a failure while the caller reads the body
+    # is not. The connection only goes back to the pool if the body was read
+    # to the end.
+    conn, response, _ = self._send(method, path, None, headers, read=False)
+    try:
+      yield response
+    finally:
+      self._release(conn, response)
+
+  def _send(self, method, path, body, headers, read):
+    # Returns (conn, response, body) for the first attempt that got a usable
+    # response; with read=False the body is left to the caller. Streamed
+    # bodies (file-like objects) cannot be replayed, so those requests are only
+    # retried when the connection could not be opened at all.
+    replayable = body is None or isinstance(body, (bytes, str))
+    attempt = 0
+    while True:
+      conn, reused = self._get()
+      try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        data = response.read() if read or response.status >= 400 else None
+      except (OSError, http.client.HTTPException) as e:
+        conn.close()
+        # The server closed a pooled connection after _get() checked it. The
+        # request may still have reached it, so only idempotent ones are sent
+        # again; a POST /prompt must never be queued twice.
+        stale = reused and isinstance(e, (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError))
+        refused = isinstance(e, ConnectionRefusedError)
+        if stale and replayable and method in IDEMPOTENT_METHODS:
+          continue
+        if attempt < RETRIES and (refused or (replayable and method in IDEMPOTENT_METHODS)):
+          time.sleep(BACKOFF_FACTOR * (2 ** attempt))
+          attempt += 1
+          continue
+        raise
+      if response.status < 400:
+        return conn, response, data
+      self._release(conn, response)
+      if response.status in RETRY_STATUSES and method in IDEMPOTENT_METHODS and attempt < RETRIES:
+        time.sleep(BACKOFF_FACTOR * (2 ** attempt))
+        attempt += 1
+        continue
+      url = "http://{}{}".format(self.server_address, path)
+      raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(data))
+
+  def _release(self, conn, response):
+    if response.isclosed() and not response.will_close:
+      self._put(conn)
+    else:
+      conn.close()
+
+def dropped(conn):
+  # An idle keep-alive connection only becomes readable when the server has
+  # closed it (or sent something unsolicited); either way it is unusable.
+  if conn.sock is None:
+    return True
+  try:
+    return bool(select.select([conn.sock], [], [], 0)[0])
+  except (OSError, ValueError):
+    return True
+
+def configure(pool_size=None, timeout=None, retries=None, backoff_factor=None):
+  global POOL_SIZE, TIMEOUT, RETRIES, BACKOFF_FACTOR
+  POOL_SIZE = POOL_SIZE if pool_size is None else pool_size
+  TIMEOUT = TIMEOUT if timeout is None else timeout
+  RETRIES = RETRIES if retries is None else retries
+  BACKOFF_FACTOR = BACKOFF_FACTOR if backoff_factor is None else backoff_factor
+  close_all()
+
+def close_all():
+  with _lock:
+    for pool in _pools.values():
+      pool.close()
+    _pools.clear()
+
+def get_pool(server_address):
+  with _lock:
+    pool = _pools.get(server_address)
+    if pool is None:
+      pool = ConnectionPool(server_address, POOL_SIZE, TIMEOUT)
+      _pools[server_address] = pool
+  return pool
+
+def request(method, server_address, path, body=None, headers=None, params=None):
+  if params:
+    path = "{}?{}".format(path, urllib.parse.urlencode(params))
+  return get_pool(server_address).request(method, path, body, headers)
+
+def stream(method, server_address, path, params=None, headers=None):
+  if params:
+    path = "{}?{}".format(path, urllib.parse.urlencode(params))
+  return get_pool(server_address).stream(method, path, headers)
+
+def request_json(method, server_address, path, payload=None, params=None):
+  body, headers = None, {}
+  if payload is not None:
+    body = json.dumps(payload).encode('utf-8')
+    headers['Content-Type'] = 'application/json'
+  return json.loads(request(method, server_address, path, body, headers, params) or 'null')
@@ -0,0 +1,136 @@
+import hashlib
+import io
+import math
+import os
+
+# img2img sources can be a file path, bytes, a binary stream, a PIL image or a
+# NumPy array (HxW or HxWxC, uint8). Paths and streams are uploaded as they are;
+# PIL images and arrays are encoded to PNG first. PIL is only imported for
+# those and for resizing.
+
+SIGNATURES = (
+  (b'\x89PNG\r\n\x1a\n', 'image/png', '.png'),
+  (b'\xff\xd8\xff', 'image/jpeg', '.jpg'),
+  (b'GIF8', 'image/gif', '.gif'),
+  (b'BM', 'image/bmp', '.bmp')
+)
+
+def is_path(source):
+  return isinstance(source, (str, os.PathLike))
+
+def sniff(header):
+  # (content type, extension) from the first bytes of an encoded image.
+  if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+    return 'image/webp', '.webp'
+  for signature, content_type, extension in SIGNATURES:
+    if header.startswith(signature):
+      return content_type, extension
+  return 'image/png', '.png'
+
+def seekable(source):
+  # A binary stream that can be read more than once, e.g. to sniff its header.
+  # Pipes and sockets have to be read into bytes first.
+  return hasattr(source, 'read') and hasattr(source, 'seek') and (not hasattr(source, 'seekable') or source.seekable())
+
+def peek(stream, size=12):
+  position = stream.tell()
+  header = stream.read(size)
+  stream.seek(position)
+  return header
+
+def image_bytes(source):
+  # Encoded bytes for any source that is not a path.
+  if isinstance(source, (bytes, bytearray, memoryview)):
+    return bytes(source)
+  if hasattr(source, 'read'):
+    return source.read()
+  return encode_image(to_pil(source), 'png')
+
+def to_pil(source):
+  from PIL import Image # only needed for in-memory images and resizing
+  if isinstance(source, Image.Image):
+    return source
+  if hasattr(source, '__array_interface__'):
+    return Image.fromarray(source)
+  if is_path(source):
+    return Image.open(source)
+  return Image.open(io.BytesIO(image_bytes(source)))
+
+def encode_image(image, image_format, quality=90):
+  image_format = 'jpeg' if image_format == 'jpg' else image_format
+  if image_format == 'jpeg' and image.mode not in ('RGB', 'L'):
+    image = image.convert('RGB')
+  buffer = io.BytesIO()
+  options = {'quality': quality} if image_format in ('jpeg', 'webp') else {'compress_level': 1}
+  image.save(buffer, format=image_format.upper(), **options)
+  return buffer.getvalue()
+
+def source_digest(source, chunk_size=1024 * 1024):
+  digest = hashlib.sha256()
+  if is_path(source):
+    with open(source, 'rb') as file:
+      for chunk in iter(lambda: file.read(chunk_size), b''):
+        digest.update(chunk)
+  elif seekable(source):
+    position = source.tell()
+    for chunk in iter(lambda: source.read(chunk_size), b''):
+      digest.update(chunk)
+    source.seek(position)
+  else:
+    digest.update(image_bytes(source))
+  return digest.hexdigest()
+
+def upload_name(source):
+  # The LoadImage file name for a source: the file name for paths, otherwise
+  # one derived from the content.
+  if is_path(source):
+    return os.path.basename(source)
+  if hasattr(source, 'read') and not seekable(source):
+    raise ValueError("Cannot name a stream that is not seekable without consuming it; read it with image_bytes() first")
+  if not seekable(source):
+    source = image_bytes(source)
+  header = peek(source) if seekable(source) else source[:12]
+  return 'upload_{}{}'.format(source_digest(source)[:16], sniff(header)[1])
+
+def input_resolution(template):
+  # What the workflow scales its input image to before VAEEncode, as
+  # {'max_size': (width, height)} or {'max_pixels': n}, or None if it does not.
+  loader = template.image_loader
+  if loader is None:
+    return None
+  for node_id in template.nodes_by_class.get('ImageScale', []):
+    inputs = template.graph[node_id]['inputs']
+    if inputs.get('image', [None])[0] == loader:
+      return {'max_size': (inputs['width'], inputs['height'])}
+  for node_id in template.nodes_by_class.get('ImageScaleToTotalPixels', []):
+    inputs = template.graph[node_id]['inputs']
+    if inputs.get('image', [None])[0] == loader:
+      return {'max_pixels': int(inputs['megapixels'] * 1024 * 1024)}
+  return None
+
+def prepare_upload(source, max_size=None, max_pixels=None, format=None, quality=90):
+  # Downscales the image to fit max_size (width, height) and/or max_pixels,
+  # keeping its aspect ratio, and encodes it as `format` ('png', 'jpeg',
+  # 'webp'; default: the source's format). Returns bytes ready for
+  # upload_image. A source that already fits and needs no re-encoding is
+  # returned as its original bytes.
+  format = 'jpeg' if format == 'jpg' else format
+  if not is_path(source) and (isinstance(source, (bytes, bytearray, memoryview)) or hasattr(source, 'read')):
+    source = image_bytes(source)
+  image = to_pil(source)
+  width, height = image.size
+  scale = 1.0
+  if max_size is not None:
+    scale = min(scale, max_size[0] / width, max_size[1] / height)
+  if max_pixels is not None:
+    scale = min(scale, math.sqrt(max_pixels / (width * height)))
+  source_format = (image.format or 'png').lower()
+  if scale >= 1.0 and format in (None, source_format) and (is_path(source) or isinstance(source, bytes)):
+    if not is_path(source):
+      return source
+    with open(source, 'rb') as file:
+      return file.read()
+  if scale < 1.0:
+    from PIL import Image
+    image = image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+  return encode_image(image, format or source_format, quality)
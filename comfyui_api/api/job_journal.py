@@ -0,0 +1,106 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'comfyui-api', 'jobs.sqlite')
+
+# A job moves from submitted (queued on the server, prompt_id known) to
+# completed (the server finished it) to saved (outputs are on disk), or ends as
+# failed. The prompt is stored as it was sent, seed included, so a job the
+# server lost can be resubmitted unchanged.
+SUBMITTED = 'submitted'
+COMPLETED = 'completed'
+SAVED = 'saved'
+FAILED = 'failed'
+
+class JobJournal:
+  # Persistent record of the jobs of long batch runs, keyed by (run_id, index).
+  # After a crash the same run can be started again: saved jobs are skipped and
+  # submitted ones are picked up by prompt_id instead of being generated twice.
+  def __init__(self, path=DEFAULT_PATH):
+    self.path = path
+    directory = os.path.dirname(path)
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+    self._lock = threading.Lock()
+    self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    self._db.row_factory = sqlite3.Row
+    self._db.execute('PRAGMA journal_mode=WAL')
+    self._db.execute("""
+      CREATE TABLE IF NOT EXISTS jobs (
+        run_id TEXT NOT NULL,
+        job_index INTEGER NOT NULL,
+        server_address TEXT NOT NULL,
+        prompt_id TEXT,
+        prompt TEXT NOT NULL,
+        state TEXT NOT NULL,
+        images TEXT,
+        error TEXT,
+        updated REAL NOT NULL,
+        PRIMARY KEY (run_id, job_index)
+      )
+    """)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def close(self):
+    with self._lock:
+      self._db.close()
+
+  def get(self, run_id, index):
+    with self._lock:
+      row = self._db.execute('SELECT * FROM jobs WHERE run_id = ? AND job_index = ?', (run_id, index)).fetchone()
+    return self._job(row) if row is not None else None
+
+  def jobs(self, run_id, states=None):
+    query = 'SELECT * FROM jobs WHERE run_id = ?'
+    args = [run_id]
+    if states:
+      query += ' AND state IN ({})'.format(', '.join('?' * len(states)))
+      args += list(states)
+    with self._lock:
+      rows = self._db.execute(query + ' ORDER BY job_index', args).fetchall()
+    return [self._job(row) for row in rows]
+
+  def summary(self, run_id):
+    with self._lock:
+      rows = self._db.execute('SELECT state, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY state', (run_id,)).fetchall()
+    return {state: count for state, count in rows}
+
+  def record_submitted(self, run_id, index, server_address, prompt, prompt_id):
+    self._write(
+      'INSERT OR REPLACE INTO jobs (run_id, job_index, server_address, prompt_id, prompt, state, images, error, updated) VALUES (?, ?, ?, ?, ?, ?, NULL, NULL, ?)',
+      (run_id, index, server_address, prompt_id, json.dumps(prompt), SUBMITTED, time.time())
+    )
+
+  def record_completed(self, run_id, index):
+    self._update(run_id, index, state=COMPLETED)
+
+  def record_saved(self, run_id, index, images):
+    self._update(run_id, index, state=SAVED, images=json.dumps(images))
+
+  def record_failed(self, run_id, index, error):
+    self._update(run_id, index, state=FAILED, error=str(error))
+
+  def _update(self, run_id, index, **values):
+    values['updated'] = time.time()
+    assignments = ', '.join('{} = ?'.format(column) for column in values)
+    self._write('UPDATE jobs SET {} WHERE run_id = ? AND job_index = ?'.format(assignments), tuple(values.values()) + (run_id, index))
+
+  def _write(self, statement, args):
+    # Autocommit: every state change is on disk before we act on it.
+    with self._lock:
+      self._db.execute(statement, args)
+
+  def _job(self, row):
+    job = dict(row)
+    job['index'] = job.pop('job_index')
+    job['prompt'] = json.loads(job['prompt'])
+    job['images'] = json.loads(job['images']) if job['images'] else []
+    return job
@@ -0,0 +1,107 @@
+import itertools
+import threading
+
+from comfyui_api.api.api_helpers import download_channel_images
+from comfyui_api.api.cluster import checkpoint_of
+from comfyui_api.api.comfy_session import get_session
+from comfyui_api.api.pipeline import run_pipelined
+from comfyui_api.api.progress import collect_timings
+from comfyui_api.api.websocket_api import clear_comfy_cache, get_system_stats
+
+LOADER_CLASSES = ('CheckpointLoaderSimple',)
+SAMPLER_CLASSES = ('KSampler', 'KSamplerAdvanced')
+
+class ModelScheduler:
+  # Runs queued jobs grouped by checkpoint so that each model is loaded once per
+  # group rather than whenever the request order switches models. The loaded
+  # model's group goes first, then the largest group. A group is drained before
+  # the next starts, since /free only takes effect between prompts.
+  #
+  # /free is called on a model switch (free_on_switch) and, with min_free_vram
+  # set to a fraction such as 0.1, whenever the server reports less free VRAM
+  # than that before a group. `stats` counts switches and frees and splits the
+  # server time into checkpoint loading and sampling.
+  def __init__(self, session=None, queue_depth=2, free_on_switch=True, min_free_vram=None, output_path='./output/', save_previews=False, transcode=None):
+    self.session = session or get_session()
+    self.queue_depth = queue_depth
+    self.free_on_switch = free_on_switch
+    self.min_free_vram = min_free_vram
+    self.output_path = output_path
+    self.save_previews = save_previews
+    self.transcode = transcode
+    self.loaded = None
+    self.stats = {'jobs': 0, 'model_switches': 0, 'frees': 0, 'load_seconds': 0.0, 'sampling_seconds': 0.0}
+    self._groups = {}
+    self._ids = itertools.count()
+    self._lock = threading.Lock()
+
+  def add(self, prompt, tag=None):
+    job_id = next(self._ids)
+    with self._lock:
+      self._groups.setdefault(checkpoint_of(prompt), []).append((job_id, tag, prompt))
+    return job_id
+
+  def pending(self):
+    with self._lock:
+      return sum(len(jobs) for jobs in self._groups.values())
+
+  def _next_group(self):
+    with self._lock:
+      if not self._groups:
+        return None, []
+      checkpoint = self.loaded if self.loaded in self._groups else max(self._groups, key=lambda name: len(self._groups[name]))
+      return checkpoint, self._groups.pop(checkpoint)
+
+  def run(self):
+    # Yields {'job', 'tag', 'prompt_id', 'checkpoint', 'images'} per job, plus
+    # 'error' for prompts that failed on the server. Jobs added while running
+    # are picked up, in the current group if their checkpoint is loaded.
+    while True:
+      checkpoint, jobs = self._next_group()
+      if not jobs:
+        return
+      self._prepare(checkpoint)
+      yield from self._run_group(checkpoint, jobs)
+
+  def _prepare(self, checkpoint):
+    switching = checkpoint is not None and self.loaded is not None and checkpoint != self.loaded
+    if switching:
+      self.stats['model_switches'] += 1
+    if switching and self.free_on_switch:
+      self._free(unload_models=True)
+    elif self.min_free_vram is not None and self._vram_free_fraction() < self.min_free_vram:
+      self._free(free_memory=True)
+    if checkpoint is not None:
+      self.loaded = checkpoint
+
+  def _vram_free_fraction(self):
+    devices = get_system_stats(self.session.server_address).get('devices', [])
+    fractions = [device['vram_free'] / device['vram_total'] for device in devices if device.get('vram_total')]
+    return min(fractions) if fractions else 1.0
+
+  def _free(self, unload_models=False, free_memory=False):
+    clear_comfy_cache(self.session.server_address, unload_models, free_memory)
+    self.stats['frees'] += 1
+
+  def _run_group(self, checkpoint, jobs):
+    def submit_next(pipeline):
+      with self._lock:
+        if not jobs and checkpoint in self._groups:
+          jobs.extend(self._groups.pop(checkpoint))
+        if not jobs:
+          return False
+        job = jobs.pop(0)
+      pipeline.submit(self.session, job[2], job)
+      return True
+
+    for (job_id, tag, prompt), channel in run_pipelined(submit_next, self.queue_depth):
+      result = {'job': job_id, 'tag': tag, 'prompt_id': channel.prompt_id, 'checkpoint': checkpoint}
+      self.stats['jobs'] += 1
+      if channel.error is not None:
+        yield dict(result, images=[], error=channel.error)
+        continue
+      timings = collect_timings(channel, prompt)
+      self.stats['load_seconds'] += sum(timings.node_seconds.get(name, 0) for name in LOADER_CLASSES)
+      self.stats['sampling_seconds'] += sum(timings.node_seconds.get(name, 0) for name in SAMPLER_CLASSES)
+      images = download_channel_images(channel, self.output_path, self.save_previews, self.transcode)
+      yield dict(result, images=[itm['file_name'] for itm in images])
@@ -0,0 +1,106 @@
+import collections
+import queue
+import time
+
+from comfyui_api.api.exceptions import ExecutionError, ExecutionInterrupted, PromptTimeout
+
+class Pipeline:
+  # Prompts in flight on a session, handed back in completion order. Jobs are
+  # keyed by channel, since coalesced prompts share a prompt_id. A job that
+  # needs no run (e.g. one a journal already saved) can be passed through with
+  # ready(). With raise_errors=False losing the connection is reported on
+  # channel.error like a failed prompt instead of raising.
+  #
+  # With a timeout, a prompt still unfinished that many seconds after it was
+  # queued is cancelled on the server and comes back with a PromptTimeout on
+  # channel.error.
+  def __init__(self, raise_errors=True, timeout=None):
+    self.raise_errors = raise_errors
+    self.timeout = timeout
+    self.completions = queue.Queue()
+    self.in_flight = {}
+    self._ready = collections.deque()
+    self._deadlines = {}
+    self._timed_out = set()
+
+  def __len__(self):
+    return len(self.in_flight)
+
+  def __bool__(self):
+    return bool(self.in_flight or self._ready)
+
+  def submit(self, session, prompt, job, front=False):
+    channel = session.submit(prompt, self.completions, front=front)
+    self.track(channel, job)
+    return channel
+
+  def track(self, channel, job):
+    # For a channel created with completions=pipeline.completions, e.g. by
+    # ComfySession.reattach.
+    self.in_flight[channel] = job
+    if self.timeout is not None:
+      self._deadlines[channel] = (channel.queued_at or time.monotonic()) + self.timeout
+
+  def ready(self, job):
+    self._ready.append(job)
+
+  def wake(self):
+    # Makes a blocked next_finished() return None.
+    self.completions.put(None)
+
+  def next_finished(self):
+    # Blocks until a job finishes and returns (job, channel) with the channel
+    # closed; channel is None for ready() jobs. A prompt that failed on the
+    # server comes back with channel.error set; losing the connection raises.
+    if self._ready:
+      return self._ready.popleft(), None
+    while True:
+      try:
+        channel = self.completions.get(timeout=self._wait())
+        break
+      except queue.Empty:
+        self._cancel_overdue()
+    if channel is None:
+      return None
+    channel.close()
+    job = self.in_flight.pop(channel)
+    self._deadlines.pop(channel, None)
+    if channel in self._timed_out:
+      self._timed_out.discard(channel)
+      # Unless it finished on its own before the cancel got there.
+      if isinstance(channel.error, ExecutionInterrupted):
+        channel.error = PromptTimeout(channel.prompt_id, self.timeout)
+    if self.raise_errors and channel.error is not None and not isinstance(channel.error, (ExecutionError, PromptTimeout)):
+      raise channel.error
+    return job, channel
+
+  def _wait(self):
+    # Seconds until the next prompt runs late, or None to wait indefinitely.
+    deadlines = [deadline for channel, deadline in self._deadlines.items() if channel not in self._timed_out]
+    return max(0, min(deadlines) - time.monotonic()) if deadlines else None
+
+  def _cancel_overdue(self):
+    now = time.monotonic()
+    # Newest first, so prompts still queued behind an overdue one are deleted
+    # before interrupting it lets the server start them.
+    for channel, deadline in reversed(list(self._deadlines.items())):
+      if deadline <= now and channel not in self._timed_out and not channel.done.is_set():
+        self._timed_out.add(channel)
+        # Wakes up the channel, which then comes through completions.
+        channel.session.cancel(channel)
+
+def run_pipelined(submit_next, queue_depth=None, timeout=None):
+  # Keeps up to queue_depth prompts (all with None) queued ahead so the server
+  # never idles, and yields (job, channel) as they finish. submit_next(pipeline)
+  # starts the next job and returns False once there is none left. The window
+  # is refilled before each result is yielded, i.e. before the caller spends
+  # time downloading and saving it.
+  pipeline = Pipeline(timeout=timeout)
+  def refill():
+    while (queue_depth is None or len(pipeline) < queue_depth) and submit_next(pipeline):
+      pass
+  refill()
+  while pipeline:
+    job, channel = pipeline.next_finished()
+    refill()
+    yield job, channel
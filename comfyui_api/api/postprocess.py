@@ -0,0 +1,195 @@
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from comfyui_api.api.api_helpers import output_directory, SavedImages
+from comfyui_api.api.atomic_file import atomic_open
+
+# Post-processing steps run in worker processes, so PIL work never competes
+# with the websocket reader for the GIL. Steps are small picklable objects that
+# are applied in order to an ImageJob; the image is only decoded when a step
+# needs pixels and only re-encoded when one changed it.
+
+EXTENSIONS = {'jpeg': '.jpg', 'png': '.png', 'webp': '.webp'}
+
+class ImageJob:
+  def __init__(self, data, file_name):
+    self.data = data
+    self.file_name = file_name
+    self.format = None
+    self.options = {}
+    self.text = None
+    self.exif = None
+    self.extra_files = {}
+    self.info = {}
+    self._image = None
+
+  def image(self):
+    if self._image is None:
+      from PIL import Image # only needed by the steps that touch pixels
+      self._image = Image.open(io.BytesIO(self.data))
+      self._image.load()
+      self.format = self.format or self._image.format.lower()
+      self.text = {key: value for key, value in self._image.info.items() if isinstance(value, str)}
+      self.exif = self._image.info.get('exif')
+    return self._image
+
+  def changed(self):
+    # The original bytes no longer match; encoded() re-encodes from pixels.
+    self.image()
+    self.data = None
+
+  def encoded(self):
+    if self.data is None:
+      self.data = encode(self._image, self.format, self.options, self.text, self.exif)
+    return self.data
+
+def encode(image, image_format, options=None, text=None, exif=None):
+  from PIL import PngImagePlugin
+  options = dict(options or {})
+  if image_format == 'jpeg' and image.mode not in ('RGB', 'L'):
+    image = image.convert('RGB')
+  if image_format == 'png' and text:
+    pnginfo = PngImagePlugin.PngInfo()
+    for key, value in text.items():
+      pnginfo.add_text(key, value)
+    options['pnginfo'] = pnginfo
+  elif image_format in ('jpeg', 'webp') and exif:
+    options['exif'] = exif
+  buffer = io.BytesIO()
+  image.save(buffer, format=image_format.upper(), **options)
+  return buffer.getvalue()
+
+class Step:
+  def __repr__(self):
+    return '{}({})'.format(type(self).__name__, ', '.join('{}={!r}'.format(key, value) for key, value in sorted(vars(self).items())))
+
+class Convert(Step):
+  # Re-encodes to another format, e.g. Convert('webp', quality=85).
+  def __init__(self, format, **options):
+    self.format = 'jpeg' if format.lower() == 'jpg' else format.lower()
+    self.options = options
+
+  def __call__(self, job):
+    job.changed()
+    job.format = self.format
+    job.options = self.options
+    job.file_name = os.path.splitext(job.file_name)[0] + EXTENSIONS.get(self.format, '.' + self.format)
+
+class Thumbnail(Step):
+  # Writes a small copy next to the image as <name><suffix>.<format>.
+  def __init__(self, size=(256, 256), format='jpeg', quality=80, suffix='_thumb'):
+    self.size = tuple(size)
+    self.format = format
+    self.quality = quality
+    self.suffix = suffix
+
+  def __call__(self, job):
+    thumbnail = job.image().copy()
+    thumbnail.thumbnail(self.size)
+    name = os.path.splitext(job.file_name)[0] + self.suffix + EXTENSIONS.get(self.format, '.' + self.format)
+    job.extra_files[name] = encode(thumbnail, self.format, {'quality': self.quality})
+    job.info['thumbnail'] = name
+
+class StripMetadata(Step):
+  # Drops the embedded workflow/prompt text chunks and EXIF data.
+  def __call__(self, job):
+    job.changed()
+    job.text = {}
+    job.exif = None
+
+class EmbedMetadata(Step):
+  # Adds text chunks, e.g. EmbedMetadata({'source': 'comfyui-api'}). Only PNG
+  # outputs can carry them.
+  def __init__(self, metadata):
+    self.metadata = dict(metadata)
+
+  def __call__(self, job):
+    job.changed()
+    job.text = dict(job.text, **self.metadata)
+
+class Hash(Step):
+  # Records the digest of the final bytes under its algorithm name. Put it last.
+  def __init__(self, algorithm='sha256'):
+    self.algorithm = algorithm
+
+  def __call__(self, job):
+    job.info[self.algorithm] = hashlib.new(self.algorithm, job.encoded()).hexdigest()
+
+def process_image(steps, data, file_name, directory):
+  # Runs in a worker process and writes the results itself, so only the input
+  # bytes and a small dict cross the process boundary.
+  job = ImageJob(data, file_name)
+  for step in steps:
+    step(job)
+  os.makedirs(directory, exist_ok=True)
+  for name, extra in job.extra_files.items():
+    with atomic_open(os.path.join(directory, name)) as file:
+      file.write(extra)
+  destination = os.path.join(directory, job.file_name)
+  with atomic_open(destination) as file:
+    file.write(job.encoded())
+  return dict(job.info, file_name=job.file_name, path=destination)
+
+class PostProcessor:
+  # Saves images through `steps` in a process pool. At most max_pending images
+  # are queued or being processed at a time; process() blocks the producer
+  # beyond that, so a slow disk cannot make memory grow without bound.
+  def __init__(self, steps=(), max_workers=None, max_pending=None):
+    self.steps = list(steps)
+    self.max_workers = max_workers or os.cpu_count() or 1
+    self.max_pending = max_pending or 2 * self.max_workers
+    self._slots = threading.BoundedSemaphore(self.max_pending)
+    self._executor = None
+    self._lock = threading.Lock()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def key(self):
+    # Identifies the output this processor produces, for the result cache.
+    return [repr(step) for step in self.steps]
+
+  def close(self):
+    with self._lock:
+      if self._executor is not None:
+        self._executor.shutdown()
+        self._executor = None
+
+  def submit(self, image, directory):
+    # `image` is an item like the ones save_image takes ('image_data',
+    # 'file_name', 'type'). Blocks while max_pending images are in flight.
+    with self._lock:
+      if self._executor is None:
+        self._executor = ProcessPoolExecutor(self.max_workers)
+      executor = self._executor
+    self._slots.acquire()
+    try:
+      future = executor.submit(process_image, self.steps, image['image_data'], image['file_name'], directory)
+    except BaseException:
+      self._slots.release()
+      raise
+    future.add_done_callback(lambda _: self._slots.release())
+    return future
+
+  def process(self, images, output_path, save_previews=False):
+    # Consumes `images` as they arrive (a list or a generator such as
+    # stream_websocket_images) and returns the saved images like save_image.
+    pending = []
+    for itm in images:
+      directory = output_directory(output_path, itm['type'], save_previews)
+      # Keep only the names: the image bytes are released once processed.
+      pending.append((itm['file_name'], itm['type'], self.submit(itm, directory)))
+    saved = SavedImages()
+    for file_name, image_type, future in pending:
+      try:
+        saved.append(dict(future.result(), type=image_type))
+      except Exception as e:
+        print(f"Failed to save image {file_name}: {e}")
+        saved.failed += 1
+    return saved
@@ -0,0 +1,187 @@
+import json
+import threading
+import time
+from collections import namedtuple
+
+from comfyui_api.api.exceptions import ExecutionError, ExecutionInterrupted, PromptTimeout
+
+# kind is one of: queued, execution_start, executing, cached, progress, preview,
+# executed, error, interrupted, done. timestamp comes from time.monotonic().
+ProgressEvent = namedtuple('ProgressEvent', ['kind', 'timestamp', 'prompt_id', 'node', 'data'])
+
+MESSAGE_KINDS = {
+  'execution_start': 'execution_start',
+  'executing': 'executing',
+  'execution_cached': 'cached',
+  'progress': 'progress',
+  'executed': 'executed',
+  'execution_error': 'error',
+  'execution_interrupted': 'interrupted'
+}
+
+def iter_progress_events(ws, prompt_id, queued_at=None, timeout=None):
+  # Turns the raw websocket (or session channel) messages of one prompt into
+  # typed events, ending with a `done` event once the prompt has finished.
+  # With a timeout, PromptTimeout is raised once that many seconds have passed
+  # since the prompt was queued.
+  queued_at = queued_at if queued_at is not None else time.monotonic()
+  deadline = queued_at + timeout if timeout is not None else None
+  yield ProgressEvent('queued', queued_at, prompt_id, None, {})
+  while True:
+    out = _recv(ws, prompt_id, deadline, timeout)
+    now = getattr(ws, 'received_at', None) or time.monotonic()
+    if not isinstance(out, str):
+      yield ProgressEvent('preview', now, prompt_id, None, out)
+      continue
+    message = json.loads(out)
+    kind = MESSAGE_KINDS.get(message['type'])
+    data = message.get('data') or {}
+    if kind is None or data.get('prompt_id', prompt_id) != prompt_id:
+      continue
+    if kind == 'executing' and data['node'] is None:
+      yield ProgressEvent('done', now, prompt_id, None, data)
+      return
+    yield ProgressEvent(kind, now, prompt_id, data.get('node', data.get('node_id')), data)
+
+def _recv(ws, prompt_id, deadline, timeout):
+  if deadline is None:
+    return ws.recv()
+  remaining = deadline - time.monotonic()
+  if remaining <= 0:
+    raise PromptTimeout(prompt_id, timeout)
+  if not hasattr(ws, 'settimeout'): # a session channel
+    try:
+      return ws.recv(timeout=remaining)
+    except TimeoutError:
+      raise PromptTimeout(prompt_id, timeout)
+  import websocket # a plain websocket-client connection, so already imported
+  ws.settimeout(remaining)
+  try:
+    return ws.recv()
+  except (TimeoutError, websocket.WebSocketTimeoutException):
+    raise PromptTimeout(prompt_id, timeout)
+
+def collect_timings(channel, prompt):
+  # PromptTimings for a prompt whose session channel has already finished, so
+  # every message up to the final `executing` is waiting in it.
+  timings = PromptTimings(prompt, channel.prompt_id)
+  for event in iter_progress_events(channel, channel.prompt_id, channel.queued_at):
+    timings.observe(event)
+  return timings
+
+def raise_for_event(event):
+  if event.kind == 'error':
+    raise ExecutionError(event.prompt_id, event.data)
+  if event.kind == 'interrupted':
+    raise ExecutionInterrupted(event.prompt_id, event.data)
+
+class PromptTimings:
+  # Builds a per-prompt latency breakdown from progress events. Client-side
+  # stages such as download and save are added with record_stage().
+  def __init__(self, prompt, prompt_id):
+    self.prompt_id = prompt_id
+    self.class_types = {node_id: node['class_type'] for node_id, node in prompt.items()}
+    self.queued_at = None
+    self.started_at = None
+    self.finished_at = None
+    self.node_seconds = {}
+    self.cached_nodes = 0
+    self.error = None
+    self.stages = {}
+    self._current = None
+    self._progress = []
+
+  def observe(self, event):
+    if self.prompt_id is None:
+      self.prompt_id = event.prompt_id
+    if event.kind == 'queued':
+      self.queued_at = event.timestamp
+    elif event.kind == 'execution_start':
+      self.started_at = event.timestamp
+    elif event.kind == 'cached':
+      self.cached_nodes += len(event.data.get('nodes', []))
+    elif event.kind == 'progress':
+      self._progress.append((event.timestamp, event.data['value']))
+    elif event.kind in ('error', 'interrupted'):
+      self.error = event.data.get('exception_message', event.kind)
+    if event.kind in ('executing', 'done', 'error', 'interrupted'):
+      self._close_node(event.timestamp)
+      if event.kind == 'executing':
+        self._current = (event.node, event.timestamp)
+    if event.kind == 'done':
+      self.finished_at = event.timestamp
+
+  def _close_node(self, now):
+    if self._current is not None:
+      node_id, since = self._current
+      class_type = self.class_types.get(node_id, node_id)
+      self.node_seconds[class_type] = self.node_seconds.get(class_type, 0) + now - since
+      self._current = None
+
+  def record_stage(self, stage, seconds):
+    self.stages[stage] = self.stages.get(stage, 0) + seconds
+
+  def sampler_steps_per_second(self):
+    if len(self._progress) < 2:
+      return None
+    (first_time, first_step), (last_time, last_step) = self._progress[0], self._progress[-1]
+    return (last_step - first_step) / (last_time - first_time) if last_time > first_time else None
+
+  def breakdown(self):
+    started = self.started_at if self.started_at is not None else self.queued_at
+    return {
+      'prompt_id': self.prompt_id,
+      'queue_wait': started - self.queued_at if started is not None and self.queued_at is not None else None,
+      'execution': self.finished_at - started if self.finished_at is not None and started is not None else None,
+      'nodes': dict(self.node_seconds),
+      'cached_nodes': self.cached_nodes,
+      'sampler_steps_per_second': self.sampler_steps_per_second(),
+      'stages': dict(self.stages),
+      'error': self.error
+    }
+
+class TimingRecorder:
+  # Collects PromptTimings breakdowns. Each one can be appended as a JSON line
+  # to json_lines_path, and the aggregate is available in the Prometheus text
+  # exposition format through prometheus().
+  def __init__(self, json_lines_path=None, prefix='comfyui'):
+    self.json_lines_path = json_lines_path
+    self.prefix = prefix
+    self._lock = threading.Lock()
+    self._count = 0
+    self._stage_sums = {}
+    self._node_sums = {}
+    self._steps_per_second = None
+
+  def record(self, timings):
+    breakdown = timings.breakdown()
+    with self._lock:
+      self._count += 1
+      stages = dict(breakdown['stages'], queue_wait=breakdown['queue_wait'], execution=breakdown['execution'])
+      for stage, seconds in stages.items():
+        if seconds is not None:
+          self._stage_sums[stage] = self._stage_sums.get(stage, 0) + seconds
+      for class_type, seconds in breakdown['nodes'].items():
+        self._node_sums[class_type] = self._node_sums.get(class_type, 0) + seconds
+      if breakdown['sampler_steps_per_second'] is not None:
+        self._steps_per_second = breakdown['sampler_steps_per_second']
+      if self.json_lines_path is not None:
+        with open(self.json_lines_path, 'a') as file:
+          file.write(json.dumps(breakdown) + '\n')
+    return breakdown
+
+  def prometheus(self):
+    p = self.prefix
+    with self._lock:
+      lines = [
+        '# TYPE {}_prompts_total counter'.format(p),
+        '{}_prompts_total {}'.format(p, self._count),
+        '# TYPE {}_stage_seconds_total counter'.format(p)
+      ]
+      lines += ['{}_stage_seconds_total{{stage="{}"}} {}'.format(p, stage, seconds) for stage, seconds in sorted(self._stage_sums.items())]
+      lines.append('# TYPE {}_node_seconds_total counter'.format(p))
+      lines += ['{}_node_seconds_total{{class_type="{}"}} {}'.format(p, class_type, seconds) for class_type, seconds in sorted(self._node_sums.items())]
+      if self._steps_per_second is not None:
+        lines.append('# TYPE {}_sampler_steps_per_second gauge'.format(p))
+        lines.append('{}_sampler_steps_per_second {}'.format(p, self._steps_per_second))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from comfyui_api.api.atomic_file import atomic_open
+from comfyui_api.api.exceptions import PromptValidationError
+from comfyui_api.api.websocket_api import get_object_info, get_system_stats
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'comfyui-api', 'object_info')
+
+# A copy fetched from the server less than this many seconds ago is not
+# fetched again for a prompt that fails against it, e.g. over a typo.
+MIN_REFRESH_INTERVAL = 10
+
+def is_link(value):
+  return isinstance(value, list) and len(value) == 2 and isinstance(value[1], int)
+
+def input_specs(info):
+  specs = {}
+  for section in ('required', 'optional'):
+    for name, spec in (info.get('input') or {}).get(section, {}).items():
+      specs[name] = (section == 'required', spec[0], spec[1] if len(spec) > 1 else {})
+  return specs
+
+def types_match(produced, expected):
+  if '*' in (produced, expected):
+    return True
+  return bool(set(produced.split(',')) & set(expected.split(',')))
+
+def validate_prompt(prompt, object_info, check_choices=True):
+  # Returns a list of problems ComfyUI would reject the prompt for: unknown
+  # node classes, missing required inputs, broken links, links between
+  # mismatched types, numbers out of range and values not among a combo's
+  # choices. An empty list means the prompt looks fine.
+  errors = []
+  outputs = 0
+  for node_id, node in prompt.items():
+    class_type = node.get('class_type')
+    info = object_info.get(class_type)
+    if info is None:
+      errors.append("Node {}: unknown class_type {!r}".format(node_id, class_type))
+      continue
+    outputs += bool(info.get('output_node'))
+    inputs = node.get('inputs', {})
+    for name, (required, kind, options) in input_specs(info).items():
+      if name not in inputs:
+        if required:
+          errors.append("Node {} ({}): missing required input {!r}".format(node_id, class_type, name))
+        continue
+      value = inputs[name]
+      where = "Node {} ({}) input {!r}".format(node_id, class_type, name)
+      if is_link(value):
+        source = prompt.get(value[0])
+        source_info = object_info.get(source['class_type']) if source is not None else None
+        if source is None:
+          errors.append("{}: links to missing node {}".format(where, value[0]))
+        elif source_info is not None:
+          produced = source_info.get('output', [])
+          if value[1] >= len(produced):
+            errors.append("{}: node {} has no output {}".format(where, value[0], value[1]))
+          elif isinstance(kind, str) and kind != 'COMBO' and not types_match(produced[value[1]], kind):
+            errors.append("{}: expects {} but node {} outputs {}".format(where, kind, value[0], produced[value[1]]))
+        continue
+      choices = kind if isinstance(kind, list) else options.get('options') if kind == 'COMBO' else None
+      if choices is not None:
+        if check_choices and not options.get('image_upload') and value not in choices:
+          errors.append("{}: {!r} is not one of the server's choices".format(where, value))
+      elif kind in ('INT', 'FLOAT'):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+          errors.append("{}: expects {} but got {!r}".format(where, kind, value))
+        elif 'min' in options and value < options['min'] or 'max' in options and value > options['max']:
+          errors.append("{}: {} is outside [{}, {}]".format(where, value, options.get('min'), options.get('max')))
+      elif kind == 'BOOLEAN' and not isinstance(value, bool):
+        errors.append("{}: expects BOOLEAN but got {!r}".format(where, value))
+      elif kind == 'STRING' and not isinstance(value, str):
+        errors.append("{}: expects STRING but got {!r}".format(where, value))
+  if not outputs and not errors:
+    errors.append("Prompt has no output node")
+  return errors
+
+def uses_unknown_definitions(prompt, object_info):
+  # Whether the prompt uses node classes or inputs object_info does not know,
+  # as happens when a custom node was installed or updated since it was fetched.
+  for node in prompt.values():
+    info = object_info.get(node.get('class_type'))
+    if info is None or set(node.get('inputs', {})) - set(input_specs(info)):
+      return True
+  return False
+
+def prune_prompt(prompt, object_info):
+  # Drops every node no output node depends on; ComfyUI would never run them.
+  # Nodes of unknown classes are kept so validation can report them. Kept
+  # nodes are shared with the original prompt, not copied.
+  keep = set()
+  stack = [node_id for node_id, node in prompt.items() if object_info.get(node['class_type'], {'output_node': True}).get('output_node')]
+  while stack:
+    node_id = stack.pop()
+    if node_id in keep or node_id not in prompt:
+      continue
+    keep.add(node_id)
+    stack.extend(value[0] for value in prompt[node_id].get('inputs', {}).values() if is_link(value))
+  return {node_id: node for node_id, node in prompt.items() if node_id in keep}
+
+class PromptValidator:
+  # Checks prompts against the server's /object_info before they are queued.
+  # /object_info is fetched once per server and cached on disk under the
+  # server's ComfyUI version, so later processes skip the (large) download.
+  # Model and image lists, and custom nodes, change without a version bump, so
+  # a prompt that fails only on combo choices, or uses classes or inputs the
+  # cached copy does not know, is checked again against a fresh copy.
+  def __init__(self, directory=DEFAULT_DIRECTORY, prune=True):
+    self.directory = directory
+    self.prune = prune
+    self._lock = threading.Lock()
+    self._object_info = {}
+    self._fetched_at = {}
+    self._watched = set()
+
+  def object_info(self, server_address, refresh=False):
+    with self._lock:
+      if not refresh and server_address in self._object_info:
+        return self._object_info[server_address]
+    version = self._server_version(server_address)
+    path = os.path.join(self.directory, hashlib.sha256('{}|{}'.format(server_address, version).encode('utf-8')).hexdigest()[:32] + '.json')
+    object_info = None
+    if not refresh:
+      try:
+        with open(path, 'r') as file:
+          object_info = json.load(file)
+      except (FileNotFoundError, ValueError):
+        pass
+    fetched_at = None
+    if object_info is None:
+      object_info = get_object_info(server_address)
+      fetched_at = time.monotonic()
+      os.makedirs(self.directory, exist_ok=True)
+      with atomic_open(path) as file:
+        file.write(json.dumps(object_info).encode('utf-8'))
+    with self._lock:
+      self._object_info[server_address] = object_info
+      self._fetched_at[server_address] = fetched_at
+    return object_info
+
+  def _server_version(self, server_address):
+    system = get_system_stats(server_address).get('system', {})
+    return system.get('comfyui_version') or '{}|{}'.format(system.get('python_version'), system.get('embedded_python'))
+
+  def invalidate(self, server_address=None):
+    with self._lock:
+      for address in [address for address in self._object_info if server_address is None or address == server_address]:
+        del self._object_info[address]
+        del self._fetched_at[address]
+
+  def watch(self, session):
+    # A reconnect may mean the server was restarted, possibly upgraded.
+    if id(session) not in self._watched:
+      self._watched.add(id(session))
+      session.add_reconnect_listener(lambda session: self.invalidate(session.server_address))
+
+  def validate(self, prompt, server_address):
+    object_info = self.object_info(server_address)
+    errors = validate_prompt(prompt, object_info)
+    if errors and not self._recently_fetched(server_address) and (not validate_prompt(prompt, object_info, check_choices=False) or uses_unknown_definitions(prompt, object_info)):
+      errors = validate_prompt(prompt, self.object_info(server_address, refresh=True))
+    return errors
+
+  def _recently_fetched(self, server_address):
+    with self._lock:
+      fetched_at = self._fetched_at.get(server_address)
+    return fetched_at is not None and time.monotonic() - fetched_at < MIN_REFRESH_INTERVAL
+
+  def prepare(self, prompt, server_address):
+    # Returns the prompt to send (pruned unless prune=False) or raises
+    # PromptValidationError.
+    if self.prune:
+      prompt = prune_prompt(prompt, self.object_info(server_address))
+    errors = self.validate(prompt, server_address)
+    if errors:
+      raise PromptValidationError(errors)
+    return prompt
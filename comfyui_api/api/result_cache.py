@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from comfyui_api.api.api_helpers import output_directory
+from comfyui_api.api.atomic_file import atomic_open
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'comfyui-api', 'results')
+
+def _normalize(value):
+  if isinstance(value, dict):
+    # UI-only metadata such as node titles does not change the result.
+    return {key: _normalize(item) for key, item in value.items() if key != '_meta'}
+  if isinstance(value, (list, tuple)):
+    return [_normalize(item) for item in value]
+  if isinstance(value, float) and value.is_integer():
+    return int(value)
+  return value
+
+def canonical_prompt(prompt):
+  return json.dumps(_normalize(prompt), sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+def prompt_hash(prompt, extra=''):
+  # `extra` covers inputs that are not part of the graph itself, such as the
+  # content hash of an uploaded img2img source.
+  digest = hashlib.sha256(canonical_prompt(prompt).encode('utf-8'))
+  digest.update(extra.encode('utf-8'))
+  return digest.hexdigest()
+
+class ResultCache:
+  # Client-side store of finished generations keyed by prompt_hash. Only
+  # prompts with a fixed seed can ever hit. The store is bounded by max_bytes
+  # (least recently used entries go first) and entries expire after ttl seconds.
+  def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=2 * 1024 ** 3, ttl=None):
+    self.directory = directory
+    self.max_bytes = max_bytes
+    self.ttl = ttl
+    self.hits = 0
+    self.misses = 0
+    self._lock = threading.Lock()
+    self._index_path = os.path.join(directory, 'index.json')
+    self._index = self._load()
+
+  def key(self, prompt, extra=''):
+    return prompt_hash(prompt, extra)
+
+  def stats(self):
+    with self._lock:
+      return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._index), 'bytes': sum(entry['size'] for entry in self._index.values())}
+
+  def restore(self, key, output_path, save_previews=False):
+    # Copies a cached result into output_path and returns the saved images
+    # like download_images does, or None on a miss.
+    with self._lock:
+      entry = self._index.get(key)
+      if entry is not None and self.ttl is not None and time.time() - entry['created'] > self.ttl:
+        self._remove(key)
+        entry = None
+      if entry is None:
+        self.misses += 1
+        return None
+      self.hits += 1
+      entry['last_access'] = time.time()
+      self._save()
+    saved = []
+    for itm in entry['files']:
+      directory = output_directory(output_path, itm['type'], save_previews)
+      os.makedirs(directory, exist_ok=True)
+      destination = os.path.join(directory, itm['file_name'])
+      try:
+        shutil.copyfile(os.path.join(self.directory, key, itm['file_name']), destination)
+      except FileNotFoundError:
+        # Evicted concurrently or removed by hand; regenerate instead.
+        with self._lock:
+          if key in self._index:
+            self._remove(key)
+        return None
+      saved.append({'file_name': itm['file_name'], 'type': itm['type'], 'path': destination})
+    return saved
+
+  def put(self, key, saved):
+    entry_directory = os.path.join(self.directory, key)
+    os.makedirs(entry_directory, exist_ok=True)
+    size = 0
+    for itm in saved:
+      shutil.copyfile(itm['path'], os.path.join(entry_directory, itm['file_name']))
+      size += os.path.getsize(itm['path'])
+    now = time.time()
+    with self._lock:
+      self._index[key] = {
+        'files': [{'file_name': itm['file_name'], 'type': itm['type']} for itm in saved],
+        'size': size,
+        'created': now,
+        'last_access': now
+      }
+      self._evict()
+      self._save()
+
+  def _evict(self):
+    now = time.time()
+    if self.ttl is not None:
+      for key in [key for key, entry in self._index.items() if now - entry['created'] > self.ttl]:
+        self._remove(key)
+    total = sum(entry['size'] for entry in self._index.values())
+    for key in sorted(self._index, key=lambda key: self._index[key]['last_access']):
+      if total <= self.max_bytes:
+        break
+      total -= self._index[key]['size']
+      self._remove(key)
+
+  def _remove(self, key):
+    del self._index[key]
+    shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+
+  def _load(self):
+    try:
+      with open(self._index_path, 'r') as file:
+        return json.load(file)
+    except FileNotFoundError:
+      return {}
+    except ValueError as e:
+      print(f"Ignoring unreadable result cache index {self._index_path}: {e}")
+      return {}
+
+  def _save(self):
+    os.makedirs(self.directory, exist_ok=True)
+    with atomic_open(self._index_path) as file:
+      file.write(json.dumps(self._index).encode('utf-8'))
@@ -0,0 +1,129 @@
+import io
+import sys
+import threading
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+# Output images decoded to NumPy arrays (height x width x channels, uint8), for
+# pipelines that feed results to a model rather than to disk. With shared=True
+# each array lives in a multiprocessing.shared_memory block, and the picklable
+# SharedImage handle is all that has to be sent to a worker process: the worker
+# maps the same memory, so the pixels are neither copied nor written to disk.
+#
+# Lifetime: the process that decoded the images owns the blocks and must call
+# release() (or use the SharedImages as a context manager) once every worker is
+# done with them. Workers only open() a handle and never free the block; it is
+# unmapped once the with block is over and no array refers to it any more.
+
+_attach_lock = threading.Lock()
+
+def decode_array(image_data):
+  from PIL import Image # only needed to decode
+  image = Image.open(io.BytesIO(image_data))
+  if image.mode not in ('RGB', 'RGBA', 'L'):
+    image = image.convert('RGBA' if 'A' in image.mode else 'RGB')
+  return np.asarray(image)
+
+def attach(name):
+  # Python < 3.13 registers every attached block with the process's resource
+  # tracker, which would free it when the worker exits; only the owner may.
+  if sys.version_info >= (3, 13):
+    return shared_memory.SharedMemory(name, track=False)
+  with _attach_lock:
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+      return shared_memory.SharedMemory(name)
+    finally:
+      resource_tracker.register = register
+
+class SharedImage:
+  # Handle to one decoded image in shared memory. Pickles to its name, shape
+  # and dtype only.
+  def __init__(self, name, shape, dtype, file_name, type):
+    self.name = name
+    self.shape = tuple(shape)
+    self.dtype = np.dtype(dtype).str
+    self.file_name = file_name
+    self.type = type
+    self._block = None
+
+  @classmethod
+  def create(cls, array, file_name, type):
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    image = cls(block.name, array.shape, array.dtype, file_name, type)
+    image._block = block
+    return image
+
+  def __getstate__(self):
+    return dict(self.__dict__, _block=None)
+
+  def open(self):
+    # Context manager yielding the array, backed by the shared block. The array
+    # (and any view of it) stays usable after the with block, until the owner
+    # releases the block.
+    return _Mapping(self)
+
+  def release(self):
+    # Frees the block. Only the owner calls this, after every worker is done.
+    if self._block is not None:
+      self._block.close()
+      self._block.unlink()
+      self._block = None
+
+  def __repr__(self):
+    return 'SharedImage({!r}, {}, {})'.format(self.file_name, self.shape, self.name)
+
+class _Pinned:
+  # Base of an array mapped from a block. NumPy only keeps the mmap as the base
+  # of an array built on block.buf, and closing the block unmaps it under the
+  # array. This is the base instead, so the block is closed with the last array
+  # or view that uses it.
+  def __init__(self, block, shape, dtype):
+    self.block = block
+    address = np.frombuffer(block.buf, np.uint8).ctypes.data
+    self.__array_interface__ = {'shape': shape, 'typestr': np.dtype(dtype).str, 'data': (address, False), 'version': 3}
+
+  def __del__(self):
+    self.block.close()
+
+class _Mapping:
+  def __init__(self, image):
+    self.image = image
+    self.array = None
+
+  def __enter__(self):
+    self.array = np.asarray(_Pinned(attach(self.image.name), self.image.shape, self.image.dtype))
+    return self.array
+
+  def __exit__(self, *exc):
+    # Unmapped right away unless the caller kept the array or a view of it.
+    self.array = None
+
+class SharedImages(list):
+  # The SharedImage handles of one generation, owned by this process.
+  def release(self):
+    for image in self:
+      image.release()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.release()
+
+def decode_images(images, shared=False):
+  # Decodes {'image_data', 'file_name', 'type'} dicts as yielded by iter_images
+  # or stream_websocket_images. Returns dicts with an 'array' in place of the
+  # bytes, or, with shared=True, SharedImages.
+  if not shared:
+    return [{'array': decode_array(itm['image_data']), 'file_name': itm['file_name'], 'type': itm['type']} for itm in images]
+  decoded = SharedImages()
+  try:
+    for itm in images:
+      decoded.append(SharedImage.create(decode_array(itm['image_data']), itm['file_name'], itm['type']))
+  except BaseException:
+    decoded.release()
+    raise
+  return decoded
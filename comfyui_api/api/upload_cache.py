@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from comfyui_api.api.atomic_file import atomic_open
+from comfyui_api.api.image_input import is_path, image_bytes, sniff, source_digest
+from comfyui_api.api.websocket_api import upload_image
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'comfyui-api', 'uploads.json')
+
+class UploadCache:
+  # Remembers which input images (by content hash) already exist on which
+  # server. Files are uploaded under their hash, so a hit can skip the upload
+  # and point LoadImage at the existing file. Entries are evicted LRU once
+  # max_entries is exceeded and persisted to `path` between runs.
+  def __init__(self, path=DEFAULT_PATH, max_entries=1000):
+    self.path = path
+    self.max_entries = max_entries
+    self.hits = 0
+    self.misses = 0
+    self._lock = threading.Lock()
+    self._entries = OrderedDict()
+    self._watched = set()
+    self._load()
+
+  def upload(self, input_path, server_address):
+    # input_path may be any source upload_image accepts.
+    if not is_path(input_path):
+      input_path = image_bytes(input_path)
+      extension = sniff(input_path[:12])[1]
+    else:
+      extension = os.path.splitext(input_path)[1].lower() or '.png'
+    digest = source_digest(input_path)
+    name = digest[:32] + extension
+    key = (server_address, digest)
+    with self._lock:
+      if key in self._entries:
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self._save()
+        return self._entries[key]
+    upload_image(input_path, name, server_address, overwrite=True)
+    with self._lock:
+      self.misses += 1
+      self._entries[key] = name
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+      self._save()
+    return name
+
+  def invalidate(self, server_address=None):
+    with self._lock:
+      for key in [key for key in self._entries if server_address is None or key[0] == server_address]:
+        del self._entries[key]
+      self._save()
+
+  def watch(self, session):
+    # Forget a server's uploads whenever its session has to reconnect, since
+    # a restarted server may have lost its input folder.
+    if id(session) not in self._watched:
+      self._watched.add(id(session))
+      session.add_reconnect_listener(lambda session: self.invalidate(session.server_address))
+
+  def _load(self):
+    try:
+      with open(self.path, 'r') as file:
+        for server_address, digest, name in json.load(file)['entries']:
+          self._entries[(server_address, digest)] = name
+    except FileNotFoundError:
+      pass
+    except (ValueError, KeyError) as e:
+      print(f"Ignoring unreadable upload cache {self.path}: {e}")
+
+  def _save(self):
+    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+    entries = [[server_address, digest, name] for (server_address, digest), name in self._entries.items()]
+    with atomic_open(self.path) as file:
+      file.write(json.dumps({'entries': entries}).encode('utf-8'))
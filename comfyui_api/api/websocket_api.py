@@ -0,0 +1,104 @@
+import json
+
+from comfyui_api.api.atomic_file import atomic_open
+from comfyui_api.api.image_input import is_path, image_bytes, peek, seekable, sniff
+from comfyui_api.api.http_pool import request, request_json, stream
+
+CHUNK_SIZE = 64 * 1024
+
+def upload_image(input_path, name, server_address, image_type="input", overwrite=False):
+  # input_path may also be bytes, a binary stream, a PIL image or a NumPy
+  # array (see api.image_input). Files and streams are sent without being
+  # read into memory first.
+  if is_path(input_path):
+    with open(input_path, 'rb') as file:
+      return _upload(file, name, server_address, image_type, overwrite)
+  if seekable(input_path):
+    return _upload(input_path, name, server_address, image_type, overwrite)
+  return _upload(image_bytes(input_path), name, server_address, image_type, overwrite)
+
+def _upload(body, name, server_address, image_type, overwrite):
+  from requests_toolbelt import MultipartEncoder # pulls in requests; only needed for uploads
+  content_type = sniff(body[:12] if isinstance(body, bytes) else peek(body))[0]
+  multipart_data = MultipartEncoder(
+    fields= {
+      'image': (name, body, content_type),
+      'type': image_type,
+      'overwrite': str(overwrite).lower()
+    }
+  )
+  headers = { 'Content-Type': multipart_data.content_type, 'Content-Length': str(multipart_data.len) }
+  return request('POST', server_address, '/upload/image', multipart_data, headers)
+
+def queue_prompt(prompt, client_id, server_address, front=False):
+  # front=True puts the prompt at the head of the server queue instead of the back.
+  p = {"prompt": prompt, "client_id": client_id}
+  if front:
+    p["front"] = True
+  return request_json('POST', server_address, '/prompt', p)
+
+def interupt_prompt(server_address, prompt_id=None):
+  # Recent ComfyUI versions only interrupt when prompt_id is the running prompt.
+  if prompt_id is None:
+    return request('POST', server_address, '/interrupt')
+  return request_json('POST', server_address, '/interrupt', {'prompt_id': prompt_id})
+
+def delete_queued_prompts(prompt_ids, server_address):
+  return request_json('POST', server_address, '/queue', {'delete': list(prompt_ids)})
+
+def cancel_prompt(prompt_id, server_address):
+  # Removes a pending prompt from the server queue, or interrupts it if it is
+  # already running. Deleting first means a prompt that starts in between is
+  # still caught by the interrupt.
+  delete_queued_prompts([prompt_id], server_address)
+  running = [item[1] for item in get_queue(server_address).get('queue_running', [])]
+  if prompt_id in running:
+    interupt_prompt(server_address, prompt_id)
+    return 'interrupted'
+  return 'deleted'
+
+def get_image(filename, subfolder, folder_type, server_address):
+  data = {"filename": filename, "subfolder": subfolder, "type": folder_type}
+  return request('GET', server_address, '/view', params=data)
+
+def download_image(filename, subfolder, folder_type, server_address, destination):
+  # Copies the /view response to disk in chunks instead of buffering it.
+  data = {"filename": filename, "subfolder": subfolder, "type": folder_type}
+  with stream('GET', server_address, '/view', params=data) as response, atomic_open(destination) as file:
+    while True:
+      chunk = response.read(CHUNK_SIZE)
+      if not chunk:
+        break
+      file.write(chunk)
+  return destination
+
+def get_history(prompt_id, server_address):
+  return request_json('GET', server_address, '/history/{}'.format(prompt_id))
+
+def get_histories(server_address, max_items=None):
+  # The newest max_items entries of /history, or all of them, in one request.
+  return request_json('GET', server_address, '/history', params={'max_items': max_items} if max_items else None)
+
+def delete_history(prompt_ids, server_address):
+  return request_json('POST', server_address, '/history', {'delete': list(prompt_ids)})
+
+def get_queue(server_address):
+  return request_json('GET', server_address, '/queue')
+
+def get_system_stats(server_address):
+  return request_json('GET', server_address, '/system_stats')
+
+def get_object_info(server_address):
+  return request_json('GET', server_address, '/object_info')
+
+def get_node_info_by_class(node_class, server_address):
+  return request_json('GET', server_address, '/object_info/{}'.format(node_class))
+
+def clear_comfy_cache(server_address, unload_models=False, free_memory=False):
+  clear_data = {
+    "unload_models": unload_models,
+    "free_memory": free_memory
+  }
+  data = json.dumps(clear_data).encode('utf-8')
+  return request('POST', server_address, '/free', data, {'Content-Type': 'application/json'})
+
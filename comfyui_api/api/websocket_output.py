@@ -0,0 +1,75 @@
+import json
+import struct
+
+from comfyui_api.api.progress import iter_progress_events, raise_for_event
+
+# Binary websocket frames start with a big-endian uint32 event type. For image
+# events a uint32 image format follows (1 = JPEG, 2 = PNG), then the encoded
+# image. PREVIEW_IMAGE_WITH_METADATA instead carries a uint32 length and a JSON
+# metadata block before the image.
+PREVIEW_IMAGE = 1
+UNENCODED_PREVIEW_IMAGE = 2
+PREVIEW_IMAGE_WITH_METADATA = 4
+IMAGE_FORMATS = {1: 'jpeg', 2: 'png'}
+
+WEBSOCKET_OUTPUT_NODE = 'SaveImageWebsocket'
+
+def use_websocket_output(prompt):
+  # Returns a copy of the prompt with every SaveImage node replaced by a node
+  # that sends the image over the websocket instead of writing it on the server,
+  # plus the ids of those nodes.
+  prompt = dict(prompt)
+  output_node_ids = set()
+  for node_id, node in prompt.items():
+    if node['class_type'] == 'SaveImage':
+      prompt[node_id] = {'class_type': WEBSOCKET_OUTPUT_NODE, 'inputs': {'images': node['inputs']['images']}}
+      output_node_ids.add(node_id)
+  return prompt, output_node_ids
+
+def parse_binary_frame(frame):
+  event_type = struct.unpack_from('>I', frame, 0)[0]
+  if event_type == PREVIEW_IMAGE_WITH_METADATA:
+    length = struct.unpack_from('>I', frame, 4)[0]
+    metadata = json.loads(bytes(frame[8:8 + length]))
+    image_format = metadata.get('image_type', '').split('/')[-1] or None
+    return event_type, image_format, frame[8 + length:], metadata
+  if event_type in (PREVIEW_IMAGE, UNENCODED_PREVIEW_IMAGE):
+    image_type = struct.unpack_from('>I', frame, 4)[0]
+    return event_type, IMAGE_FORMATS.get(image_type), frame[8:], None
+  return event_type, None, frame[4:], None
+
+def iter_websocket_images(ws, prompt_id, output_node_ids, include_previews=False, queued_at=None, timings=None, timeout=None):
+  # Yields images from the websocket as they are produced, until the prompt is
+  # done. Frames sent while an output node executes are final images; all
+  # others (KSampler previews) are only yielded with include_previews.
+  current_node = None
+  index = 0
+  for event in iter_progress_events(ws, prompt_id, queued_at, timeout):
+    if timings is not None:
+      timings.observe(event)
+    raise_for_event(event)
+    if event.kind == 'executing':
+      current_node = event.node
+    if event.kind != 'preview':
+      continue
+
+    event_type, image_format, image_data, metadata = parse_binary_frame(event.data)
+    if image_format is None:
+      continue
+    node = metadata.get('node_id', current_node) if metadata else current_node
+    if node in output_node_ids:
+      kind = 'output'
+    elif include_previews:
+      kind = 'preview'
+    else:
+      continue
+    extension = 'jpg' if image_format == 'jpeg' else image_format
+    yield {
+      'image_data': image_data,
+      'file_name': '{}_{}_{:05}.{}'.format(prompt_id, node, index, extension),
+      'type': 'output' if kind == 'output' else 'temp',
+      'kind': kind,
+      'node': node,
+      'format': image_format
+    }
+    index += 1
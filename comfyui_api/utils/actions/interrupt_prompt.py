@@ -0,0 +1,7 @@
+from comfyui_api.api.websocket_api import interupt_prompt, cancel_prompt
+def interrupt(server_address='127.0.0.1:8188', prompt_id=None):
+  # Without a prompt_id whatever is running is interrupted; with one, only that
+  # prompt is cancelled, whether it is still queued or already running.
+  if prompt_id is None:
+    return interupt_prompt(server_address)
+  return cancel_prompt(prompt_id, server_address)
@@ -0,0 +1,25 @@
+from comfyui_api.api.api_helpers import generate_image_by_prompt_and_image
+from comfyui_api.api.image_input import is_path, image_bytes, input_resolution, prepare_upload, seekable, upload_name
+from comfyui_api.utils.helpers.workflow_template import as_template
+
+def prompt_image_to_image(workflow, input_path, positve_prompt, negative_prompt='', save_previews=False, transcode=None, upload_cache=None, seed=None, result_cache=None, resize=None, upload_format=None, quality=90):
+  # input_path may be a file path, bytes, a binary stream, a PIL image or a
+  # NumPy array. resize shrinks the image before upload: a (width, height) box,
+  # {'max_size': ..., 'max_pixels': ...}, or 'auto' for whatever the workflow
+  # scales its input to anyway. upload_format ('jpeg', 'webp', 'png')
+  # re-encodes it, e.g. to upload a large PNG as a much smaller JPEG.
+  template = as_template(workflow)
+  if resize == 'auto':
+    resize = input_resolution(template)
+  elif isinstance(resize, (tuple, list)):
+    resize = {'max_size': resize}
+  if resize or upload_format:
+    input_path = prepare_upload(input_path, format=upload_format, quality=quality, **(resize or {}))
+  elif not is_path(input_path) and not seekable(input_path):
+    # Encode PIL images and arrays once; a pipe can only be read once.
+    input_path = image_bytes(input_path)
+  filename = upload_name(input_path)
+  prompt = template.render(positve_prompt, negative_prompt, seed=seed, image=filename)
+  if seed is None:
+    result_cache = None # a random seed would never hit
+  return generate_image_by_prompt_and_image(prompt, './output/', input_path, filename, save_previews, transcode=transcode, upload_cache=upload_cache, result_cache=result_cache)
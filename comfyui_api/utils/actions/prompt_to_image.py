@@ -0,0 +1,13 @@
+from comfyui_api.api.api_helpers import generate_image_by_prompt
+from comfyui_api.utils.helpers.workflow_template import as_template
+
+def build_prompt(workflow, positve_prompt, negative_prompt='', seed=None):
+  return as_template(workflow).render(positve_prompt, negative_prompt, seed=seed)
+
+def prompt_to_image(workflow, positve_prompt, negative_prompt='', save_previews=False, transcode=None, seed=None, result_cache=None):
+  # Pass a fixed seed to make the prompt deterministic, and so cacheable. A
+  # random seed would never hit, so result_cache is not used without one.
+  prompt = build_prompt(workflow, positve_prompt, negative_prompt, seed)
+  if seed is None:
+    result_cache = None
+  return generate_image_by_prompt(prompt, './output/', save_previews, transcode=transcode, result_cache=result_cache)
@@ -0,0 +1,84 @@
+from comfyui_api.api.api_helpers import download_channel_images
+from comfyui_api.api.comfy_session import get_session
+from comfyui_api.api.job_journal import SAVED, FAILED
+from comfyui_api.api.pipeline import run_pipelined
+from comfyui_api.utils.actions.prompt_to_image import build_prompt
+
+def prompt_to_image_batch(workflow, prompts, negative_prompt='', save_previews=False, queue_depth=None, output_path='./output/', session=None, transcode=None, journal=None, run_id='batch', reconciler=None, timeout=None):
+  # Submits prompts ahead of time so ComfyUI always has work queued while we
+  # download and save earlier results. `prompts` holds positive prompt strings or
+  # (positive, negative) tuples. With queue_depth=None everything is queued up
+  # front; otherwise at most queue_depth prompts are in flight (use at least 2 to
+  # keep the GPU busy). Results are yielded in completion order. A prompt that
+  # fails on the server is yielded with an 'error' and no images instead of
+  # stopping the batch; losing the connection still raises. With a timeout, a
+  # prompt unfinished that many seconds after it was queued is cancelled and
+  # yielded with a PromptTimeout; since the clock starts at queueing, use a
+  # queue_depth with it.
+  #
+  # With a JobJournal every job is recorded under (run_id, position in prompts).
+  # Running the same batch again after a crash yields the jobs saved before from
+  # the journal, waits for the ones still on the server instead of resubmitting
+  # them and only generates what is left.
+  #
+  # A HistoryReconciler for the session's server looks the results up with bulk
+  # /history requests and can delete them from the server once saved.
+  session = session or get_session()
+  pending = enumerate(prompts)
+
+  def submit(pipeline, index, positive, prompt):
+    channel = pipeline.submit(session, prompt, (index, positive))
+    if journal is not None:
+      journal.record_submitted(run_id, index, session.server_address, prompt, channel.prompt_id)
+    return channel
+
+  def submit_next(pipeline):
+    for index, item in pending:
+      positive, negative = item if isinstance(item, tuple) else (item, negative_prompt)
+      job = journal.get(run_id, index) if journal is not None else None
+      if job is None:
+        channel = submit(pipeline, index, positive, build_prompt(workflow, positive, negative))
+      elif job['state'] in (SAVED, FAILED):
+        result = {'prompt_id': job['prompt_id'], 'prompt': positive, 'images': job['images']}
+        if job['state'] == FAILED:
+          result['error'] = job['error']
+        pipeline.ready(result)
+        continue
+      else:
+        channel = None
+        if job['server_address'] == session.server_address:
+          channel = session.reattach(job['prompt_id'], pipeline.completions)
+        if channel is not None:
+          pipeline.track(channel, (index, positive))
+        else:
+          channel = submit(pipeline, index, positive, job['prompt'])
+      if reconciler is not None:
+        reconciler.track(channel.prompt_id, channel)
+      return True
+    return False
+
+  try:
+    for job, channel in run_pipelined(submit_next, queue_depth, timeout):
+      if channel is None:
+        yield job # saved by an earlier run
+        continue
+      index, positive = job
+      if channel.error is not None:
+        if journal is not None:
+          journal.record_failed(run_id, index, channel.error)
+        if reconciler is not None:
+          reconciler.forget(channel.prompt_id)
+        yield {'prompt_id': channel.prompt_id, 'prompt': positive, 'images': [], 'error': channel.error}
+        continue
+      if journal is not None:
+        journal.record_completed(run_id, index)
+      if reconciler is not None:
+        images = reconciler.download_images(channel.prompt_id, output_path, save_previews, transcode)
+      else:
+        images = download_channel_images(channel, output_path, save_previews, transcode)
+      if journal is not None:
+        journal.record_saved(run_id, index, [itm['file_name'] for itm in images])
+      yield {'prompt_id': channel.prompt_id, 'prompt': positive, 'images': [itm['file_name'] for itm in images]}
+  finally:
+    if reconciler is not None:
+      reconciler.flush()
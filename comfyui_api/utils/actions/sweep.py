@@ -0,0 +1,123 @@
+from comfyui_api.api.api_helpers import download_channel_images
+from comfyui_api.api.comfy_session import get_session
+from comfyui_api.api.pipeline import run_pipelined
+from comfyui_api.api.progress import collect_timings
+from comfyui_api.utils.helpers.workflow_template import as_template
+import itertools
+
+# Axis names with a fixed meaning. Any other name is an input of the KSampler
+# (cfg, steps, sampler_name, ...) or of the first node that has such an input
+# (width, ckpt_name, ...), and '<node_id>.<input>' targets one node directly.
+PROMPT_AXES = ('prompt', 'negative')
+
+def axis_target(template, name):
+  # Returns (node_id, input_name) for an axis.
+  if name == 'prompt':
+    return template.positive, None
+  if name == 'negative':
+    return template.negative, None
+  if name == 'seed':
+    return template.sampler, 'seed'
+  if '.' in name:
+    node_id, input_name = name.split('.', 1)
+    if node_id in template.graph:
+      return node_id, input_name
+  if template.sampler is not None and name in template.graph[template.sampler]['inputs']:
+    return template.sampler, name
+  for node_id, node in template.graph.items():
+    if name in node['inputs']:
+      return node_id, name
+  raise ValueError(f"No node in the workflow has an input named {name!r}")
+
+def downstream_counts(graph):
+  # Number of nodes that (transitively) consume each node's output. Changing an
+  # input of a node invalidates ComfyUI's cache for it and all of those.
+  consumers = {node_id: set() for node_id in graph}
+  for node_id, node in graph.items():
+    for value in node['inputs'].values():
+      if isinstance(value, list) and len(value) == 2 and value[0] in consumers:
+        consumers[value[0]].add(node_id)
+  counts = {}
+  def count(node_id, seen):
+    for consumer in consumers[node_id]:
+      if consumer not in seen:
+        seen.add(consumer)
+        count(consumer, seen)
+    return seen
+  for node_id in graph:
+    counts[node_id] = len(count(node_id, set()))
+  return counts
+
+def plan_sweep(template, axes, batch_size=1):
+  # Returns the list of (params, prompt) to submit, in the order that keeps the
+  # most of ComfyUI's node cache: axes whose node feeds more of the graph vary
+  # slowest, so e.g. CLIPTextEncode only reruns when the prompt text changes and
+  # the seed is the innermost loop.
+  #
+  # With batch_size > 1 the seeds are packed into groups that run as one prompt
+  # with EmptyLatentImage.batch_size set. ComfyUI derives the noise of the whole
+  # batch from the first seed of a group, so the images are not the same as
+  # running each seed alone; that is why packing is opt-in.
+  template = as_template(template)
+  axes = {name: list(values) for name, values in axes.items()}
+  latent = template.first('EmptyLatentImage')
+  if batch_size > 1 and latent is not None and 'seed' in axes:
+    seeds = axes['seed']
+    axes['seed'] = [seeds[i:i + batch_size] for i in range(0, len(seeds), batch_size)]
+
+  targets = {name: axis_target(template, name) for name in axes}
+  counts = downstream_counts(template.graph)
+  order = sorted(axes, key=lambda name: (-counts.get(targets[name][0], 0), name == 'seed'))
+  fixed_seed = template.graph[template.sampler]['inputs'].get('seed') if template.sampler is not None else None
+
+  plan = []
+  for values in itertools.product(*(axes[name] for name in order)):
+    params = dict(zip(order, values))
+    inputs = {}
+    for name, value in params.items():
+      node_id, input_name = targets[name]
+      if name not in PROMPT_AXES and name != 'seed':
+        inputs.setdefault(node_id, {})[input_name] = value
+    seed = params.get('seed', fixed_seed)
+    if isinstance(seed, list):
+      inputs.setdefault(latent, {})['batch_size'] = len(seed)
+      seed = seed[0]
+    prompt = template.render(params.get('prompt'), params.get('negative'), seed=seed, inputs=inputs)
+    plan.append((params, prompt))
+  return plan
+
+def sweep(template, axes, batch_size=1, queue_depth=None, save_previews=False, output_path='./output/', session=None, transcode=None):
+  # Runs every combination of the axes, e.g.
+  # sweep(workflow, {'prompt': [...], 'cfg': [6, 7, 8], 'seed': [1, 2, 3]}),
+  # and yields each result in completion order with its params and the node
+  # cache hits reported by ComfyUI. 'cache_hit_ratio' is the share of nodes
+  # served from the cache so far over the whole sweep.
+  session = session or get_session()
+  plan = iter(plan_sweep(template, axes, batch_size))
+  cached_nodes = 0
+  total_nodes = 0
+
+  def submit_next(pipeline):
+    try:
+      params, prompt = next(plan)
+    except StopIteration:
+      return False
+    pipeline.submit(session, prompt, (params, prompt))
+    return True
+
+  for (params, prompt), channel in run_pipelined(submit_next, queue_depth):
+    result = {'prompt_id': channel.prompt_id, 'params': params}
+    if channel.error is not None:
+      yield dict(result, images=[], error=channel.error)
+      continue
+
+    # The channel is closed, but its messages are still there to collect.
+    timings = collect_timings(channel, prompt)
+    cached_nodes += timings.cached_nodes
+    total_nodes += len(prompt)
+    images = download_channel_images(channel, output_path, save_previews, transcode)
+    yield dict(result,
+      images=[itm['file_name'] for itm in images],
+      cached_nodes=timings.cached_nodes,
+      cache_hit_ratio=cached_nodes / total_nodes
+    )
@@ -0,0 +1,78 @@
+import functools
+import json
+
+from comfyui_api.utils.helpers.randomize_seed import generate_random_15_digit_number
+
+TEXT_KEYS = ('text', 'text_g', 'text_l')
+
+class WorkflowTemplate:
+  # A workflow parsed and indexed once. render() returns a ready-to-send prompt
+  # that shares every untouched node with the template and only copies the
+  # nodes it patches, so treat rendered prompts as read-only.
+  def __init__(self, workflow):
+    self.graph = json.loads(workflow) if isinstance(workflow, str) else workflow
+    self.nodes_by_class = {}
+    for node_id, node in self.graph.items():
+      self.nodes_by_class.setdefault(node['class_type'], []).append(node_id)
+
+    self.sampler = self.first('KSampler')
+    self.positive = self._linked_input(self.sampler, 'positive')
+    self.negative = self._linked_input(self.sampler, 'negative')
+    self.positive_keys = self._text_keys(self.positive)
+    self.negative_keys = self._text_keys(self.negative)
+    self.image_loader = self.first('LoadImage')
+
+  @classmethod
+  def from_file(cls, workflow_path):
+    with open(workflow_path, 'r') as file:
+      return cls(json.load(file))
+
+  def first(self, class_type):
+    node_ids = self.nodes_by_class.get(class_type)
+    return node_ids[0] if node_ids else None
+
+  def _linked_input(self, node_id, name):
+    if node_id is None:
+      return None
+    link = self.graph[node_id]['inputs'].get(name)
+    return link[0] if isinstance(link, list) else None
+
+  def _text_keys(self, node_id):
+    if node_id is None:
+      return ()
+    keys = tuple(key for key in TEXT_KEYS if key in self.graph[node_id]['inputs'])
+    return keys or ('text',)
+
+  def render(self, positive=None, negative=None, seed=None, image=None, inputs=None):
+    # positive/negative/image are left as in the workflow when None or ''.
+    # `inputs` maps node ids to extra input overrides, e.g. {'3': {'cfg': 7}}.
+    patches = {}
+    if self.sampler is not None:
+      patches[self.sampler] = {'seed': generate_random_15_digit_number() if seed is None else seed}
+    if positive and self.positive is not None:
+      patches.setdefault(self.positive, {}).update(dict.fromkeys(self.positive_keys, positive))
+    if negative and self.negative is not None:
+      patches.setdefault(self.negative, {}).update(dict.fromkeys(self.negative_keys, negative))
+    if image and self.image_loader is not None:
+      patches.setdefault(self.image_loader, {})['image'] = image
+    for node_id, values in (inputs or {}).items():
+      patches.setdefault(node_id, {}).update(values)
+
+    prompt = dict(self.graph)
+    for node_id, values in patches.items():
+      node = self.graph[node_id]
+      prompt[node_id] = dict(node, inputs=dict(node['inputs'], **values))
+    return prompt
+
+@functools.lru_cache(maxsize=16)
+def _template_from_string(workflow):
+  return WorkflowTemplate(workflow)
+
+def as_template(workflow):
+  # Accepts a WorkflowTemplate, a workflow dict or the JSON string returned by
+  # load_workflow. Strings are parsed once and the template is reused.
+  if isinstance(workflow, WorkflowTemplate):
+    return workflow
+  if isinstance(workflow, str):
+    return _template_from_string(workflow)
+  return WorkflowTemplate(workflow)
@@ -1,15 +1,17 @@
-from utils.actions.prompt_to_image import prompt_to_image
-from utils.actions.prompt_image_to_image import prompt_image_to_image
-from utils.actions.load_workflow import load_workflow
-from api.api_helpers import clear
+from comfyui_api.utils.actions.prompt_to_image import prompt_to_image
+from comfyui_api.utils.actions.prompt_to_image_batch import prompt_to_image_batch
+from comfyui_api.utils.actions.prompt_image_to_image import prompt_image_to_image
+from comfyui_api.utils.actions.load_workflow import load_workflow
+from comfyui_api.api.api_helpers import clear
 import sys
 
 def main():
     try:
       print("Welcome to the program!")
       workflow = load_workflow('./workflows/base_workflow.json')
-      for iter in range(1, 11):
-        prompt_to_image(workflow, '(realistic:1.25), beautiful:1.1) mountain landscape with a deep blue lake, photolike, high detail, monoton colors', 'lowres, text, branding, watermark, humans, frames, painting', save_previews=True)
+      prompts = ['(realistic:1.25), beautiful:1.1) mountain landscape with a deep blue lake, photolike, high detail, monoton colors'] * 10
+      for result in prompt_to_image_batch(workflow, prompts, 'lowres, text, branding, watermark, humans, frames, painting', save_previews=True):
+        print('Saved: ', result['images'])
       # prompt_to_image(workflow, '(beautiful woman:1.3) sitting on a desk in a nice restaurant with a (glass of wine and plate with salat:0.9), (candlelight dinner atmosphere:1.1), (wearing a red evening dress:1.2), dimmed lighting, cinema, high detail', save_previews=True)
       # input_path = './input/ComfyUI_00241_.png'
       # prompt_image_to_image(workflow, input_path, '(white woman wearing a black evening dress:1.5), dimmed lighting, cinema, high detail', save_previews=True)
@@ -21,7 +23,8 @@ def exit_program():
   print("Exiting the program...")
   sys.exit(0)
 
-def clear_comfy():
-  clear(True, True)
+def clear_comfy(server_address='127.0.0.1:8188'):
+  clear(server_address, unload_models=True, free_memory=True)
 
-main()
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,21 @@
+import json
+import os
+
+import pytest
+
+from bench.fake_comfy import FakeComfyUI
+
+WORKFLOWS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflows')
+
+def load_workflow(name):
+  with open(os.path.join(WORKFLOWS, name)) as file:
+    return json.load(file)
+
+@pytest.fixture
+def workflow():
+  return load_workflow('base_workflow.json')
+
+@pytest.fixture
+def fake():
+  with FakeComfyUI(sampler_steps=2, image_size=1024) as server:
+    yield server
@@ -0,0 +1,23 @@
+import asyncio
+import os
+
+import aiohttp
+
+from comfyui_api.api import async_client
+from comfyui_api.utils.actions.prompt_to_image import build_prompt
+
+def test_generate(workflow, fake, tmp_path):
+  images = asyncio.run(async_client.generate(workflow, fake.address, str(tmp_path)))
+  assert [itm['type'] for itm in images] == ['output']
+  assert images[0]['image_data'] == fake._image
+  assert os.listdir(str(tmp_path)) == [images[0]['file_name']]
+
+def test_concurrent_generate_on_one_connection_pool(workflow, fake, tmp_path):
+  async def run():
+    async with aiohttp.ClientSession() as http:
+      prompts = [build_prompt(workflow, 'a cat', seed=seed) for seed in range(3)]
+      return await asyncio.gather(*[async_client.generate(prompt, fake.address, str(tmp_path), http=http) for prompt in prompts])
+  results = asyncio.run(run())
+  assert [len(images) for images in results] == [1, 1, 1]
+  assert fake.request_counts['prompt'] == 3
+  assert len(os.listdir(str(tmp_path))) == 3
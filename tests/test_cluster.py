@@ -0,0 +1,19 @@
+from comfyui_api.api.cluster import ComfyCluster
+from bench.fake_comfy import FakeComfyUI
+from comfyui_api.utils.actions.prompt_to_image import build_prompt
+
+def test_prompts_survive_a_node_going_down(workflow, tmp_path):
+  prompts = [build_prompt(workflow, 'a cat', seed=seed) for seed in range(8)]
+  with FakeComfyUI(sampler_steps=5, step_delay=0.05) as first, FakeComfyUI(sampler_steps=5, step_delay=0.05) as second:
+    cluster = ComfyCluster([first.address, second.address], reconnect_attempts=1)
+    results = []
+    for result in cluster.map(prompts, str(tmp_path)):
+      results.append(result)
+      if len(results) == 1:
+        second.stop()
+    cluster.close()
+  assert len(results) == 8
+  assert all(len(result['images']) == 1 for result in results)
+  assert not cluster.nodes[1].alive
+  # Whatever was queued on the stopped node ran again on the other one.
+  assert first.request_counts['prompt'] + second.request_counts['prompt'] > 8
@@ -0,0 +1,51 @@
+import threading
+import time
+
+from comfyui_api.api.api_helpers import generate_image_by_prompt
+from comfyui_api.api.comfy_session import ComfySession
+from comfyui_api.api.model_scheduler import ModelScheduler
+from bench.fake_comfy import FakeComfyUI
+from comfyui_api.utils.actions.sweep import sweep
+
+def test_late_waiters_join_after_previews(workflow, tmp_path):
+  # The fake sends a binary preview frame per sampler step, so the waiters
+  # started later have preview frames replayed when they join.
+  with FakeComfyUI(sampler_steps=20, step_delay=0.02, image_size=1024) as fake:
+    session = ComfySession(fake.address, coalesce=True).connect()
+    results, errors = [], []
+    def run(index):
+      try:
+        results.append(generate_image_by_prompt(workflow, str(tmp_path / str(index)), session=session))
+      except Exception as e:
+        errors.append(e)
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(4)]
+    threads[0].start()
+    time.sleep(0.15)
+    for thread in threads[1:]:
+      thread.start()
+    for thread in threads:
+      thread.join(timeout=20)
+    session.close()
+  assert errors == []
+  assert [len(images) for images in results] == [1, 1, 1, 1]
+  assert fake.request_counts['prompt'] == 1
+  assert session.stats == {'prompts_queued': 1, 'runs_saved': 3}
+  # The shared result is downloaded once and saved for every waiter.
+  assert (fake.request_counts['history'], fake.request_counts['view']) == (1, 1)
+
+def test_sweep_with_duplicate_prompts(workflow, fake, tmp_path):
+  session = ComfySession(fake.address, coalesce=True).connect()
+  results = list(sweep(workflow, {'seed': [5, 5, 6]}, output_path=str(tmp_path), session=session))
+  session.close()
+  assert sorted(result['params']['seed'] for result in results) == [5, 5, 6]
+  assert all(len(result['images']) == 1 for result in results)
+
+def test_model_scheduler_with_duplicate_prompts(workflow, fake, tmp_path):
+  session = ComfySession(fake.address, coalesce=True).connect()
+  scheduler = ModelScheduler(session, queue_depth=3, output_path=str(tmp_path))
+  for tag in ('a', 'b'):
+    scheduler.add(workflow, tag)
+  results = list(scheduler.run())
+  session.close()
+  assert sorted(result['tag'] for result in results) == ['a', 'b']
+  assert all(len(result['images']) == 1 for result in results)
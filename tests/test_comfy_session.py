@@ -0,0 +1,48 @@
+import json
+import threading
+
+from comfyui_api.api.api_helpers import track_progress
+from comfyui_api.api.comfy_session import ComfySession
+from comfyui_api.api.pipeline import Pipeline
+from comfyui_api.utils.actions.prompt_to_image import build_prompt
+from bench.fake_comfy import FakeComfyUI
+
+def test_close_wakes_up_waiters(workflow):
+  with FakeComfyUI(stall_classes=('KSampler',)) as fake:
+    session = ComfySession(fake.address).connect()
+    channel = session.submit(workflow)
+    errors = []
+    def wait():
+      try:
+        track_progress(workflow, channel, channel.prompt_id)
+      except ConnectionError as e:
+        errors.append(e)
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    session.close()
+    waiter.join(timeout=5)
+    assert not waiter.is_alive()
+    assert len(errors) == 1
+
+def test_close_keeps_finished_results(workflow, fake):
+  session = ComfySession(fake.address).connect()
+  pipeline = Pipeline()
+  channels = [pipeline.submit(session, build_prompt(workflow, 'a cat', seed=seed), seed) for seed in range(2)]
+  for channel in channels:
+    assert channel.done.wait(timeout=5)
+  session.close()
+  finished = [pipeline.next_finished() for _ in channels]
+  assert sorted(job for job, _ in finished) == [0, 1]
+  assert [channel.error for _, channel in finished] == [None, None]
+  assert not pipeline
+
+def test_binary_frames_are_parked_until_subscribed():
+  session = ComfySession('127.0.0.1:1')
+  frame = b'\x00\x00\x00\x01\x00\x00\x00\x02' + b'\x89PNG'
+  session._route(json.dumps({'type': 'executing', 'data': {'node': '9', 'prompt_id': 'p1'}}))
+  session._route(frame)
+  session._route(json.dumps({'type': 'executing', 'data': {'node': None, 'prompt_id': 'p1'}}))
+  channel = session.subscribe('p1')
+  messages = [channel.recv(timeout=1) for _ in range(3)]
+  assert messages[1] == frame
+  assert channel.done.is_set()
@@ -0,0 +1,27 @@
+import asyncio
+import time
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from comfyui_api.api.gateway import Gateway, RUNNING
+from bench.fake_comfy import FakeComfyUI
+
+def test_shutdown_cancels_running_jobs(workflow, tmp_path):
+  async def run(address):
+    gateway = Gateway([address], workers_per_server=1, output_path=str(tmp_path))
+    async with TestClient(TestServer(gateway.app())) as client:
+      response = await client.post('/jobs', json={'prompt': workflow})
+      job_id = (await response.json())['job_id']
+      for _ in range(100):
+        if gateway.jobs[job_id].status == RUNNING and gateway.jobs[job_id].channel is not None:
+          break
+        await asyncio.sleep(0.02)
+      assert gateway.jobs[job_id].status == RUNNING
+    return gateway
+
+  with FakeComfyUI(stall_classes=('KSampler',)) as fake:
+    start = time.monotonic()
+    gateway = asyncio.run(run(fake.address))
+    assert time.monotonic() - start < 10
+    assert not any(thread.is_alive() for thread in gateway._executor._threads)
+    assert fake.request_counts.get('interrupt', 0) >= 1
@@ -0,0 +1,36 @@
+from comfyui_api.api.comfy_session import ComfySession
+from comfyui_api.api.history_reconciler import HistoryReconciler, HISTORY_SLACK
+from comfyui_api.utils.actions.prompt_to_image import build_prompt
+from comfyui_api.utils.actions.prompt_to_image_batch import prompt_to_image_batch
+from bench.fake_comfy import FakeComfyUI
+
+def test_prompts_finishing_one_by_one(workflow, tmp_path):
+  # Each prompt takes longer than min_interval, so none has company.
+  with FakeComfyUI(sampler_steps=4, step_delay=0.05) as fake:
+    session = ComfySession(fake.address).connect()
+    reconciler = HistoryReconciler(fake.address, min_interval=0.1)
+    results = list(prompt_to_image_batch(workflow, ['a cat'] * 8, queue_depth=1, output_path=str(tmp_path), session=session, reconciler=reconciler))
+    session.close()
+  assert [len(result['images']) for result in results] == [1] * 8
+  assert fake.request_counts['history'] == 8
+  assert reconciler.stats['entries_fetched'] == 8
+
+def test_finished_prompts_share_one_request(workflow, fake, tmp_path):
+  session = ComfySession(fake.address).connect()
+  # History left behind by an earlier run must not be fetched again.
+  for seed in range(10):
+    channel = session.submit(build_prompt(workflow, 'a dog', seed=seed))
+    channel.done.wait(timeout=5)
+    channel.close()
+  reconciler = HistoryReconciler(fake.address, min_interval=0)
+  channels = [session.submit(build_prompt(workflow, 'a cat', seed=seed)) for seed in range(8)]
+  for channel in channels:
+    reconciler.track(channel.prompt_id, channel)
+  for channel in channels:
+    assert channel.done.wait(timeout=5)
+  for channel in channels:
+    assert len(reconciler.download_images(channel.prompt_id, str(tmp_path))) == 1
+    channel.close()
+  session.close()
+  assert fake.request_counts['history'] == 1
+  assert reconciler.stats['entries_fetched'] <= 8 + HISTORY_SLACK
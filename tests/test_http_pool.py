@@ -0,0 +1,83 @@
+import http.client
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from comfyui_api.api import http_pool
+from comfyui_api.api.websocket_api import download_image
+
+class Handler(BaseHTTPRequestHandler):
+  # Keep-alive responses. With close_after the server drops the connection
+  # afterwards without saying so, like one whose keep-alive timeout ran out.
+  protocol_version = 'HTTP/1.1'
+
+  def do_GET(self):
+    self.server.received.append(self.command)
+    if self.server.unavailable:
+      self.server.unavailable -= 1
+      self.send_response(503)
+      self.send_header('Content-Length', '0')
+      self.end_headers()
+      return
+    self._respond()
+
+  def do_POST(self):
+    self.rfile.read(int(self.headers.get('Content-Length', 0)))
+    self.server.received.append(self.command)
+    if self.server.drop_posts:
+      self.close_connection = True
+      return # no response at all
+    self._respond()
+
+  def _respond(self):
+    self.send_response(200)
+    self.send_header('Content-Length', '2')
+    self.end_headers()
+    self.wfile.write(b'{}')
+    self.close_connection = self.server.close_after
+
+  def log_message(self, *args):
+    pass
+
+@pytest.fixture
+def server():
+  server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+  server.received = []
+  server.drop_posts = False
+  server.close_after = False
+  server.unavailable = 0
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  http_pool.close_all()
+  yield server
+  server.shutdown()
+  server.server_close()
+  http_pool.close_all()
+
+def address(server):
+  return '127.0.0.1:{}'.format(server.server_address[1])
+
+def test_closed_idle_connections_are_replaced(server):
+  server.close_after = True
+  for _ in range(3):
+    assert http_pool.request_json('POST', address(server), '/prompt', {'prompt': {}}) == {}
+    time.sleep(0.05) # the connection is idle for a while, long enough to see the close
+  assert server.received == ['POST'] * 3
+
+def test_post_is_not_sent_twice(server):
+  # The POST reaches the server over the pooled connection, which then drops.
+  http_pool.request('GET', address(server), '/queue')
+  server.drop_posts = True
+  with pytest.raises(http.client.RemoteDisconnected):
+    http_pool.request_json('POST', address(server), '/prompt', {'prompt': {}})
+  assert server.received == ['GET', 'POST']
+
+def test_streamed_downloads_are_retried(server, tmp_path, monkeypatch):
+  monkeypatch.setattr(http_pool, 'BACKOFF_FACTOR', 0.01)
+  server.unavailable = 2
+  destination = str(tmp_path / 'a.png')
+  download_image('a.png', '', 'output', address(server), destination)
+  with open(destination, 'rb') as file:
+    assert file.read() == b'{}'
+  assert server.received == ['GET'] * 3
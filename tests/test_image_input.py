@@ -0,0 +1,39 @@
+import io
+import os
+
+import pytest
+
+from comfyui_api.api.comfy_session import ComfySession
+from comfyui_api.api.image_input import upload_name
+from tests.conftest import load_workflow
+from comfyui_api.utils.actions.prompt_image_to_image import prompt_image_to_image
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\0' * 64
+
+class Pipe(io.RawIOBase):
+  # A stream that can only be read once, like a socket or stdin.
+  def __init__(self, data):
+    self._data = io.BytesIO(data)
+
+  def readable(self):
+    return True
+
+  def readinto(self, buffer):
+    return self._data.readinto(buffer)
+
+def test_upload_name_does_not_consume_streams():
+  stream = io.BytesIO(PNG)
+  assert upload_name(stream) == upload_name(PNG)
+  assert stream.read() == PNG
+  with pytest.raises(ValueError):
+    upload_name(Pipe(PNG))
+
+def test_image_to_image_from_a_pipe(fake, tmp_path, monkeypatch):
+  session = ComfySession(fake.address).connect()
+  monkeypatch.setattr('comfyui_api.api.api_helpers.get_session', lambda: session)
+  monkeypatch.chdir(str(tmp_path))
+  images = prompt_image_to_image(load_workflow('basic_image_to_image.json'), Pipe(PNG), 'a cat')
+  session.close()
+  assert len(images) == 1
+  assert fake.uploads == {upload_name(PNG): len(PNG)}
+  assert os.path.exists(images[0]['path'])
@@ -0,0 +1,38 @@
+import pytest
+
+from bench import fake_comfy
+from comfyui_api.api.exceptions import PromptValidationError
+from comfyui_api.api.prompt_validation import PromptValidator
+
+def with_custom_node(workflow):
+  prompt = dict(workflow)
+  prompt['100'] = {'class_type': 'MyUpscale', 'inputs': {'image': ['8', 0], 'factor': 2}}
+  return prompt
+
+def test_custom_node_installed_after_caching(workflow, fake, tmp_path, monkeypatch):
+  PromptValidator(str(tmp_path)).prepare(workflow, fake.address)
+  assert fake.request_counts['object_info'] == 1
+  # Installing a node does not change the server version, so the copy cached
+  # on disk is now stale.
+  monkeypatch.setattr(fake_comfy, 'OBJECT_INFO', dict(fake_comfy.OBJECT_INFO, MyUpscale=fake_comfy._node({'image': ['IMAGE'], 'factor': ['INT', {'min': 1, 'max': 8}]}, ['IMAGE'])))
+  validator = PromptValidator(str(tmp_path), prune=False)
+  assert validator.validate(with_custom_node(workflow), fake.address) == []
+  assert fake.request_counts['object_info'] == 2
+
+def test_renamed_input_after_caching(workflow, fake, tmp_path, monkeypatch):
+  PromptValidator(str(tmp_path)).prepare(workflow, fake.address)
+  # An updated node that renamed its 'vae' input; the stale copy reports the
+  # old name as missing.
+  monkeypatch.setattr(fake_comfy, 'OBJECT_INFO', dict(fake_comfy.OBJECT_INFO, VAEDecode=fake_comfy._node({'samples': ['LATENT'], 'vae_model': ['VAE']}, ['IMAGE'])))
+  inputs = dict(workflow['8']['inputs'])
+  inputs['vae_model'] = inputs.pop('vae')
+  prompt = dict(workflow, **{'8': dict(workflow['8'], inputs=inputs)})
+  assert PromptValidator(str(tmp_path)).validate(prompt, fake.address) == []
+  assert fake.request_counts['object_info'] == 2
+
+def test_unknown_class_is_not_fetched_again_right_away(workflow, fake, tmp_path):
+  validator = PromptValidator(str(tmp_path), prune=False)
+  for _ in range(3):
+    with pytest.raises(PromptValidationError):
+      validator.prepare(with_custom_node(workflow), fake.address)
+  assert fake.request_counts['object_info'] == 1
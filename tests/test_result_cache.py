@@ -0,0 +1,38 @@
+from comfyui_api.api.api_helpers import generate_image_by_prompt
+from comfyui_api.api.comfy_session import ComfySession
+from comfyui_api.api.result_cache import ResultCache
+from comfyui_api.utils.actions.prompt_image_to_image import prompt_image_to_image
+from comfyui_api.utils.actions.prompt_to_image import build_prompt
+from tests.conftest import load_workflow
+
+def test_complete_results_are_cached(workflow, fake, tmp_path):
+  cache = ResultCache(str(tmp_path / 'cache'))
+  prompt = build_prompt(workflow, 'a cat', seed=5)
+  session = ComfySession(fake.address).connect()
+  first = generate_image_by_prompt(prompt, str(tmp_path / 'a'), session=session, result_cache=cache)
+  second = generate_image_by_prompt(prompt, str(tmp_path / 'b'), session=session, result_cache=cache)
+  session.close()
+  assert len(first) == len(second) == 1
+  assert fake.request_counts['prompt'] == 1
+  assert cache.stats()['entries'] == 1
+
+def test_partial_results_are_not_cached(workflow, fake, tmp_path):
+  # The fake serves random bytes behind a PNG signature, so transcoding fails.
+  cache = ResultCache(str(tmp_path / 'cache'))
+  prompt = build_prompt(workflow, 'a cat', seed=5)
+  session = ComfySession(fake.address).connect()
+  saved = generate_image_by_prompt(prompt, str(tmp_path / 'a'), session=session, transcode={'format': 'webp'}, result_cache=cache)
+  session.close()
+  assert (list(saved), saved.failed) == ([], 1)
+  assert cache.stats()['entries'] == 0
+
+def test_random_seeds_are_not_cached(fake, tmp_path, monkeypatch):
+  cache = ResultCache(str(tmp_path / 'cache'))
+  session = ComfySession(fake.address).connect()
+  monkeypatch.setattr('comfyui_api.api.api_helpers.get_session', lambda: session)
+  monkeypatch.chdir(str(tmp_path))
+  workflow = load_workflow('basic_image_to_image.json')
+  for _ in range(3):
+    prompt_image_to_image(workflow, b'\x89PNG\r\n\x1a\n' + b'\0' * 64, 'a cat', result_cache=cache)
+  session.close()
+  assert cache.stats() == {'hits': 0, 'misses': 0, 'entries': 0, 'bytes': 0}
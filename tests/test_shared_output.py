@@ -0,0 +1,15 @@
+import numpy as np
+
+from comfyui_api.api.shared_output import SharedImage
+
+def test_array_outlives_the_with_block():
+  pixels = np.arange(24, dtype=np.uint8).reshape(2, 4, 3)
+  image = SharedImage.create(pixels, 'a.png', 'output')
+  try:
+    with image.open() as array:
+      view = array[1]
+    assert (array == pixels).all()
+    del array
+    assert (view == pixels[1]).all()
+  finally:
+    image.release()
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import pytest
+
+from comfyui_api.api import async_client
+from comfyui_api.api.api_helpers import generate_image_by_prompt
+from comfyui_api.api.comfy_session import ComfySession
+from comfyui_api.api.exceptions import ExecutionError, PromptTimeout
+from comfyui_api.api.websocket_api import get_queue
+from bench.fake_comfy import FakeComfyUI
+from comfyui_api.utils.actions.prompt_to_image_batch import prompt_to_image_batch
+
+def test_stalled_prompt_times_out_and_is_interrupted(workflow, tmp_path):
+  with FakeComfyUI(sampler_steps=2, stall_classes={'KSampler'}) as fake:
+    session = ComfySession(fake.address).connect()
+    start = time.monotonic()
+    with pytest.raises(PromptTimeout):
+      generate_image_by_prompt(workflow, str(tmp_path), session=session, timeout=0.5)
+    session.close()
+  assert time.monotonic() - start < 5
+  assert fake.request_counts['interrupt'] == 1
+
+def test_queued_prompt_times_out_and_is_deleted(workflow, tmp_path):
+  with FakeComfyUI(sampler_steps=2, stall_classes={'KSampler'}) as fake:
+    session = ComfySession(fake.address).connect()
+    running = session.submit(dict(workflow))
+    with pytest.raises(PromptTimeout):
+      generate_image_by_prompt(workflow, str(tmp_path), session=session, timeout=0.5)
+    assert 'interrupt' not in fake.request_counts
+    assert get_queue(fake.address)['queue_pending'] == []
+    session.cancel(running)
+    running.close()
+    session.close()
+
+def test_failed_prompt_raises(workflow, tmp_path):
+  with FakeComfyUI(sampler_steps=2, fail_classes={'KSampler'}) as fake:
+    session = ComfySession(fake.address).connect()
+    with pytest.raises(ExecutionError) as raised:
+      generate_image_by_prompt(workflow, str(tmp_path), session=session)
+    session.close()
+  assert raised.value.node_type == 'KSampler'
+
+def test_batch_cancels_late_prompts(workflow, tmp_path):
+  with FakeComfyUI(sampler_steps=2, stall_classes={'KSampler'}) as fake:
+    session = ComfySession(fake.address).connect()
+    results = list(prompt_to_image_batch(workflow, ['a', 'b'], output_path=str(tmp_path), session=session, timeout=0.5))
+    session.close()
+  assert [type(result['error']) for result in results] == [PromptTimeout, PromptTimeout]
+  assert fake.request_counts['interrupt'] >= 1
+
+def test_async_client_raises_on_execution_error(workflow):
+  with FakeComfyUI(sampler_steps=2, fail_classes={'KSampler'}) as fake:
+    with pytest.raises(ExecutionError):
+      asyncio.run(async_client.generate(workflow, fake.address))
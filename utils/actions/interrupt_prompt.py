@@ -1,3 +0,0 @@
-from api.websocket_api import interupt_prompt
-def interrupt():
-  interupt_prompt()